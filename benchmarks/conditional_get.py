@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import sys
+import tempfile
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import events  # noqa: E402
+
+FIXTURE = Path(__file__).resolve().parent / "fixtures" / "club.ics"
+WINDOW_START = "2026-10-01"
+SLOW_TIMEOUT = 1
+
+
+class FeedHandler(BaseHTTPRequestHandler):
+    # Serves server.feed like iCloud does: with ETag and Last-Modified, and
+    # 304 Not Modified when the client's If-None-Match still matches. With
+    # server.trickle set the body arrives in small pieces, far slower than
+    # any socket timeout would notice.
+    def do_GET(self):
+        body = self.server.feed
+        etag = f'"{hashlib.sha256(body).hexdigest()[:16]}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.server.statuses.append(304)
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.server.statuses.append(200)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/calendar; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", formatdate(self.server.modified, usegmt=True))
+        self.end_headers()
+        if not self.server.trickle:
+            self.wfile.write(body)
+            return
+        try:
+            for pos in range(0, len(body), 64):
+                self.wfile.write(body[pos:pos + 64])
+                self.wfile.flush()
+                time.sleep(0.1)
+        except OSError:
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+def run(url, out_dir, parser, timeout=None):
+    # Returns (exit status, seconds) of one events.py run over the fixture.
+    if timeout is None:
+        source = ["--source", url]
+    else:
+        config = out_dir / "calendars.json"
+        config.write_text(json.dumps([{"url": url, "timeout": timeout}]), encoding="utf-8")
+        source = ["--config", str(config)]
+    argv = [
+        *source,
+        "--output",
+        str(out_dir / "events.json"),
+        "--cache-dir",
+        str(out_dir / "cache"),
+        "--start",
+        WINDOW_START,
+        "--parser",
+        parser,
+    ]
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        status = events.main(argv)
+    return status, time.perf_counter() - started
+
+
+def expect(condition, message):
+    if not condition:
+        raise SystemExit(message)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check and time the conditional GET of events.py.")
+    parser.add_argument("--parser", choices=("icalevents", "stream"), default="stream")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FeedHandler)
+    server.feed = FIXTURE.read_bytes()
+    server.modified = FIXTURE.stat().st_mtime
+    server.statuses = []
+    server.trickle = False
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/club.ics"
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            out_dir = Path(tmp)
+            status, fetched = run(url, out_dir, args.parser)
+            expect(status == 0, f"First run exited with {status}, expected 0")
+            expect(server.statuses == [200], f"First run got {server.statuses}, expected [200]")
+            written = json.loads((out_dir / "events.json").read_text(encoding="utf-8"))
+            expect(written, "First run wrote no events")
+            meta_path = events.cache_paths(out_dir / "cache", url)[1]
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            expect(meta.get("etag") and meta.get("last_modified"), "ETag/Last-Modified not cached")
+
+            status, unchanged = run(url, out_dir, args.parser)
+            expect(status == events.EXIT_UNCHANGED, f"Second run exited with {status}, expected 3")
+            expect(server.statuses == [200, 304], f"Second run got {server.statuses}, expected 304")
+
+            server.feed = server.feed.replace(b"SUMMARY:Clubabend\r\n", b"SUMMARY:Clubabend mit Gast\r\n")
+            status, _ = run(url, out_dir, args.parser)
+            expect(status == 0, f"Run after a feed change exited with {status}, expected 0")
+            expect(server.statuses[-1] == 200, "Changed feed was not fetched again")
+
+            # A feed that never completes within the source timeout falls
+            # back to the cached copy, which matches the last run.
+            server.trickle = True
+            server.feed = server.feed.replace(b"Caller: Fixture", b"Caller: Langsam")
+            status, slow = run(url, out_dir, args.parser, SLOW_TIMEOUT)
+            expect(status == events.EXIT_UNCHANGED, f"Slow feed run exited with {status}, expected 3")
+            expect(slow < SLOW_TIMEOUT + 0.5, f"Slow feed run took {slow:.1f} s, timeout is {SLOW_TIMEOUT} s")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    print(f"{len(written)} events in the window from {WINDOW_START}")
+    print(f"200 + parse: {fetched * 1e3:8.1f} ms")
+    print(f"304:         {unchanged * 1e3:8.1f} ms")
+    print(f"slow feed:   {slow * 1e3:8.1f} ms (timeout {SLOW_TIMEOUT} s, cached copy used)")
+
+
+if __name__ == "__main__":
+    main()
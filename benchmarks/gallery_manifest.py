@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+import argparse
+import importlib.util
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SCRIPT = Path(__file__).resolve().parents[1] / "scripts" / "build_gallery_manifest.py"
+spec = importlib.util.spec_from_file_location("build_gallery_manifest", SCRIPT)
+gallery = importlib.util.module_from_spec(spec)
+sys.modules[spec.name] = gallery
+spec.loader.exec_module(gallery)
+
+if gallery.Image is None:
+    raise SystemExit("Pillow is required for this benchmark")
+
+
+def synthetic_photos(images_dir, count, size, seed=1):
+    rng = random.Random(seed)
+    width, height = size
+    for index in range(count):
+        image = gallery.Image.new("RGB", size, (rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+        for _ in range(8):
+            x, y = rng.randrange(width), rng.randrange(height)
+            colour = (rng.randrange(256), rng.randrange(256), rng.randrange(256))
+            image.paste(colour, (x, y, min(width, x + width // 4), min(height, y + height // 4)))
+        image.save(images_dir / f"2025-09-{index % 28 + 1:02d}-clubabend-{index:04d}.jpg", quality=85)
+
+
+def corrupt_exif_photos(images_dir):
+    # One photo with GPS tags behind a broken IFD0 entry count, and the same
+    # photo cut off inside its EXIF block. Neither may be published with them.
+    image = gallery.Image.new("RGB", (400, 300), (200, 30, 30))
+    exif = gallery.Image.Exif()
+    exif[0x0112] = 6
+    exif.get_ifd(0x8825)[2] = (53.0, 33.0, 1.0)
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", exif=exif.tobytes())
+    data = bytearray(buffer.getvalue())
+    tiff = data.index(b"Exif\x00\x00") + 6
+    order = "little" if data[tiff : tiff + 2] == b"II" else "big"
+    ifd0 = tiff + int.from_bytes(data[tiff + 4 : tiff + 8], order)
+    data[ifd0 : ifd0 + 2] = b"\xff\xff"
+    (images_dir / "corrupt-exif.jpg").write_bytes(data)
+    (images_dir / "truncated-exif.jpg").write_bytes(data[: tiff + 20])
+
+
+def published_items(index_path):
+    site_dir = index_path.parent.parent
+    index = json.loads(index_path.read_text(encoding="utf-8"))
+    return [
+        item
+        for album in index["albums"]
+        for page in album["pages"]
+        for item in json.loads((site_dir / page).read_text(encoding="utf-8"))
+    ]
+
+
+def timed(label, func):
+    start = time.perf_counter()
+    func()
+    seconds = time.perf_counter() - start
+    print(f"{label:<24}: {seconds * 1e3:9.1f} ms")
+    return seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time full, unchanged and incremental gallery builds.")
+    parser.add_argument("--photos", type=int, default=1000)
+    parser.add_argument("--width", type=int, default=400)
+    parser.add_argument("--height", type=int, default=300)
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        images_dir, cache_dir = Path(tmp) / "gallery-pics", Path(tmp) / "cache"
+        output = Path(tmp) / "site" / "gallery-pics" / "gallery.json"
+        images_dir.mkdir()
+        synthetic_photos(images_dir, args.photos, (args.width, args.height))
+
+        def build():
+            gallery.write_manifest(images_dir, output, cache_dir, args.jobs)
+
+        print(f"{args.photos} photos of {args.width}x{args.height}, {args.jobs} jobs")
+        timed("first build", build)
+        expected = output.read_bytes()
+        unchanged = timed("no-change build", build)
+        if output.read_bytes() != expected:
+            raise SystemExit("Unchanged gallery produced a different gallery.json")
+
+        changed = sorted(images_dir.iterdir())[0]
+        synthetic_photos(images_dir, 1, (args.width, args.height), seed=2)
+        removed = sorted(images_dir.iterdir())[-1]
+        removed.unlink()
+        timed("one changed, one removed", build)
+        listed = {item["src"] for item in published_items(output)}
+        if f"gallery-pics/{removed.name}" in listed or f"gallery-pics/{changed.name}" not in listed:
+            raise SystemExit("Incremental build did not follow the gallery")
+        published = len(list((output.parent / gallery.VARIANTS_DIR).iterdir()))
+        cached = len(list((cache_dir / gallery.VARIANTS_DIR).iterdir()))
+        print(f"variants: {published} published, {cached} cached")
+
+        corrupt_exif_photos(images_dir)
+        build()
+        listed = {item["src"] for item in published_items(output)}
+        corrupt = output.parent / "corrupt-exif.jpg"
+        if "gallery-pics/corrupt-exif.jpg" not in listed or b"Exif" in corrupt.read_bytes():
+            raise SystemExit("Photo with unreadable EXIF was published with its metadata")
+        if "gallery-pics/truncated-exif.jpg" in listed or (output.parent / "truncated-exif.jpg").exists():
+            raise SystemExit("Photo that could not be stripped was published")
+
+    if unchanged >= 1:
+        raise SystemExit("No-change build took longer than a second")
+
+
+if __name__ == "__main__":
+    main()
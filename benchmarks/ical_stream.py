@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+import argparse
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from ical_stream import events_from_file  # noqa: E402
+
+try:
+    from icalevents.icalevents import events as icalevents_events
+except ImportError:  # the streaming parser is benchmarked on its own then
+    icalevents_events = None
+
+
+VTIMEZONE = """BEGIN:VTIMEZONE
+TZID:Europe/Berlin
+BEGIN:DAYLIGHT
+TZOFFSETFROM:+0100
+RRULE:FREQ=YEARLY;BYMONTH=3;BYDAY=-1SU
+DTSTART:19810329T020000
+TZNAME:CEST
+TZOFFSETTO:+0200
+END:DAYLIGHT
+BEGIN:STANDARD
+TZOFFSETFROM:+0200
+RRULE:FREQ=YEARLY;BYMONTH=10;BYDAY=-1SU
+DTSTART:19961027T030000
+TZNAME:CET
+TZOFFSETTO:+0100
+END:STANDARD
+END:VTIMEZONE"""
+
+
+def fold(line):
+    chunks = [line[:75]]
+    line = line[75:]
+    while line:
+        chunks.append(" " + line[:74])
+        line = line[74:]
+    return "\r\n".join(chunks)
+
+
+def moved_occurrence(index, window_start):
+    # Override for the series' first Thursday in the window, moved by an hour.
+    thursday = window_start + timedelta(days=(3 - window_start.weekday()) % 7)
+    original = thursday.replace(hour=19, minute=30)
+    moved = original + timedelta(hours=1)
+    return [
+        "BEGIN:VEVENT",
+        f"UID:event-{index}@ohmoors",
+        f"RECURRENCE-ID;TZID=Europe/Berlin:{original:%Y%m%dT%H%M%S}",
+        f"DTSTART;TZID=Europe/Berlin:{moved:%Y%m%dT%H%M%S}",
+        f"DTEND;TZID=Europe/Berlin:{moved + timedelta(hours=2):%Y%m%dT%H%M%S}",
+        "SUMMARY:Clubabend (verschoben)",
+        "END:VEVENT",
+    ]
+
+
+def synthetic_calendar(count, window_start, seed=1):
+    # Years of club history: mostly single evenings, some weekly series that
+    # ended long ago, a few open-ended series with exceptions and overrides.
+    rng = random.Random(seed)
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//ohmoors//benchmark//DE",
+        "X-WR-TIMEZONE:Europe/Berlin",
+        VTIMEZONE,
+    ]
+    first_day = window_start - timedelta(days=365 * 20)
+    span_days = (window_start - first_day).days + 120
+    for index in range(count):
+        day = first_day + timedelta(days=rng.randrange(span_days))
+        start = day.replace(hour=19, minute=30)
+        end = start + timedelta(hours=2, minutes=30)
+        event = [
+            "BEGIN:VEVENT",
+            f"UID:event-{index}@ohmoors",
+            f"DTSTAMP:{start:%Y%m%dT%H%M%S}Z",
+        ]
+        kind = index % 50
+        if kind == 0:
+            event.append(f"DTSTART;VALUE=DATE:{day:%Y%m%d}")
+            event.append(f"DTEND;VALUE=DATE:{day + timedelta(days=1):%Y%m%d}")
+        else:
+            event.append(f"DTSTART;TZID=Europe/Berlin:{start:%Y%m%dT%H%M%S}")
+            event.append(f"DTEND;TZID=Europe/Berlin:{end:%Y%m%dT%H%M%S}")
+        if kind == 1:
+            until = start + timedelta(weeks=rng.randrange(4, 30))
+            event.append(f"RRULE:FREQ=WEEKLY;UNTIL={until:%Y%m%dT%H%M%S}Z")
+        elif kind == 2 and index % 500 == 2:
+            event.append("RRULE:FREQ=WEEKLY;BYDAY=TH")
+            event.append(f"EXDATE;TZID=Europe/Berlin:{start + timedelta(weeks=3):%Y%m%dT%H%M%S}")
+        event.append(f"SUMMARY:Clubabend {index}\\, Mainstream")
+        event.append(f"LOCATION:Gemeindehaus\\, Raum {index % 7}")
+        event.append(fold("DESCRIPTION:" + "Caller: " + "Lorem ipsum dolor sit amet " * 4))
+        event.append("BEGIN:VALARM")
+        event.append("TRIGGER:-PT1H")
+        event.append("ACTION:DISPLAY")
+        event.append("END:VALARM")
+        event.append("END:VEVENT")
+        lines.extend(event)
+        if kind == 2 and index % 500 == 2:
+            lines.extend(moved_occurrence(index, window_start))
+    lines.append("END:VCALENDAR")
+    return "\r\n".join(lines) + "\r\n"
+
+
+def serialize(found):
+    # Same fields events.py writes to events.json.
+    rows = []
+    for e in found:
+        start_utc = e.start.astimezone(timezone.utc)
+        end_utc = e.end.astimezone(timezone.utc)
+        rows.append((
+            start_utc.strftime("%Y-%m-%d %H:%M"),
+            end_utc.strftime("%Y-%m-%d %H:%M"),
+            e.summary,
+            e.location,
+            e.description,
+        ))
+    return sorted(rows, key=lambda row: (row[0], row[2]))
+
+
+def measure(parse):
+    # Timed without tracing, which would dominate the timings; the peak comes
+    # from a second, traced run.
+    start = time.perf_counter()
+    result = parse()
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    parse()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, seconds, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare icalevents and the streaming parser.")
+    parser.add_argument("--events", type=int, default=10_000)
+    args = parser.parse_args()
+
+    start = datetime(2026, 10, 17)
+    end = start + timedelta(weeks=8)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "calendar.ics"
+        path.write_text(synthetic_calendar(args.events, start), encoding="utf-8")
+        print(f"{args.events} events, {path.stat().st_size / 1e6:.1f} MB feed, window {start:%Y-%m-%d} + 8 weeks")
+
+        streamed, stream_seconds, stream_peak = measure(lambda: events_from_file(path, start, end))
+        if icalevents_events is not None:
+            expected, ical_seconds, ical_peak = measure(
+                lambda: icalevents_events(file=str(path), start=start, end=end, sort=True, fix_apple=True)
+            )
+            if serialize(streamed) != serialize(expected):
+                raise SystemExit("Streaming parser output differs from icalevents")
+            print(f"icalevents: {ical_seconds * 1e3:8.1f} ms, peak {ical_peak / 1e6:7.1f} MB, {len(expected)} events")
+        print(f"stream:     {stream_seconds * 1e3:8.1f} ms, peak {stream_peak / 1e6:7.1f} MB, {len(streamed)} events")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from build_pages import ACTIVE_CLASS, NavTemplate  # noqa: E402
+
+
+def mark_active_regex(nav_html, page_name):
+    # Per-page implementation used before NavTemplate, kept as the reference.
+    pattern = re.compile(rf"<a([^>]*?)href=[\"']{re.escape(page_name)}[\"']([^>]*)>")
+
+    def repl(match):
+        attrs_before = match.group(1)
+        attrs_after = match.group(2)
+        full_attrs = f"{attrs_before}{attrs_after}"
+        if "data-skip-active" in full_attrs:
+            return match.group(0)
+        if "class=" in full_attrs:
+            return re.sub(
+                r"class=[\"']([^\"']*)[\"']",
+                lambda m: f'class="{m.group(1)} {ACTIVE_CLASS}"',
+                match.group(0),
+                count=1,
+            )
+        return f"<a{attrs_before}href=\"{page_name}\" class=\"{ACTIVE_CLASS}\"{attrs_after}>"
+
+    return pattern.sub(repl, nav_html)
+
+
+def synthetic_nav(base_nav, links):
+    sub_class = ' class="sub"'
+    extra = "\n".join(
+        f'          <a href="page-{i}.html"{sub_class if i % 3 == 0 else ""}>Seite {i}</a>'
+        for i in range(links)
+    )
+    return base_nav.replace('<div class="subnav">', f'<div class="subnav">\n{extra}', 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare regex and pre-split nav active marking.")
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--links", type=int, default=200)
+    args = parser.parse_args()
+
+    root = Path(__file__).resolve().parents[1]
+    nav_html = synthetic_nav((root / "static" / "nav.html").read_text(encoding="utf-8"), args.links)
+    page_names = [f"page-{i}.html" for i in range(args.pages)] + [
+        "index.html",
+        "news.html",
+        "schedule.html",
+        "about.html",
+    ]
+
+    start = time.perf_counter()
+    expected = [mark_active_regex(nav_html, name) for name in page_names]
+    regex_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    template = NavTemplate(nav_html)
+    actual = [template.render(name) for name in page_names]
+    template_seconds = time.perf_counter() - start
+
+    if actual != expected:
+        raise SystemExit("NavTemplate output differs from the regex implementation")
+
+    count = len(page_names)
+    print(f"{count} pages, nav with {nav_html.count('<a ')} links ({len(nav_html)} bytes)")
+    print(f"regex:    {regex_seconds * 1e3:8.2f} ms total, {regex_seconds / count * 1e6:8.1f} us/page")
+    print(f"template: {template_seconds * 1e3:8.2f} ms total, {template_seconds / count * 1e6:8.1f} us/page")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+import argparse
+import html
+import json
+import random
+import re
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import generate_schedule  # noqa: E402
+from generate_schedule import parse_dt, render_location  # noqa: E402
+
+
+# Per-status checks before the DETAIL_RULES table, kept as the reference.
+def is_cancelled(details):
+    return "abgesagt" in details.lower()
+
+
+def clean_cancelled_details(details):
+    cleaned = details.replace("abgesagt", "").replace("Abgesagt", "")
+    cleaned = " ".join(cleaned.replace("-", " ").split()).strip()
+    if not cleaned:
+        return "Clubabend"
+    return cleaned
+
+
+def is_no_dance(details):
+    return bool(re.search(r"kein\s+tanzen", details, flags=re.IGNORECASE))
+
+
+def clean_no_dance_reason(details):
+    cleaned = re.sub(r"kein\s+tanzen", "", details, flags=re.IGNORECASE)
+    cleaned = re.sub(r"^[\s\-–—:]+", "", cleaned)
+    cleaned = " ".join(cleaned.split()).strip()
+    return cleaned
+
+
+def load_events_reference(path):
+    # Implementation before ScheduleEvent, kept as the reference.
+    with open(path, "r", encoding="utf-8") as f:
+        events = json.load(f)
+    events.sort(key=lambda e: parse_dt(e["date"], e["time"]))
+    return events
+
+
+def render_table_reference(events):
+    rows = []
+    for e in events:
+        start_local = parse_dt(e.get("date", ""), e.get("time", ""))
+        end_local = parse_dt(e.get("end_date", ""), e.get("end_time", ""))
+        date_text = html.escape(f"{start_local.day}. {generate_schedule.MONTHS_DE[start_local.month - 1]} {start_local.year}")
+        time_text = html.escape(start_local.strftime("%H:%M"))
+        end_time = html.escape(end_local.strftime("%H:%M"))
+        raw_details = e.get("details", "")
+        cancelled = is_cancelled(raw_details)
+        no_dance = (not cancelled) and is_no_dance(raw_details)
+        if cancelled:
+            details = (
+                f"<span class=\"badge cancelled\">Abgesagt</span> "
+                f"{html.escape(clean_cancelled_details(raw_details))}"
+            )
+        elif no_dance:
+            reason = clean_no_dance_reason(raw_details)
+            reason_text = f" {html.escape(reason)}" if reason else ""
+            details = f"<span class=\"badge no-dance\">Kein Tanzen</span>{reason_text}"
+        else:
+            details = html.escape(raw_details)
+        location = render_location(e.get("location", "") or "")
+        caller = html.escape(e.get("caller", ""))
+        date_line = date_text if no_dance else f"{date_text} | {time_text}-{end_time}"
+        row_class = (
+            " class=\"is-cancelled\""
+            if cancelled
+            else (" class=\"is-no-dance\"" if no_dance else "")
+        )
+        rows.append(
+            f"        <tr{row_class} data-month=\"{start_local:%Y-%m}\">\n"
+            f"          <td data-label=\"Datum & Zeit\">{html.escape(date_line)}</td>\n"
+            f"          <td data-label=\"Details\">{details}</td>\n"
+            f"          <td data-label=\"Ort\">{location}</td>\n"
+            f"          <td data-label=\"Caller\">{caller}</td>\n"
+            "        </tr>"
+        )
+    if not rows:
+        return "      <p>Keine Termine vorhanden.</p>\n"
+    return (
+        "      <table>\n"
+        "        <thead>\n"
+        "          <tr>\n"
+        "            <th>Datum & Zeit</th>\n"
+        "            <th>Details</th>\n"
+        "            <th>Ort</th>\n"
+        "            <th>Caller</th>\n"
+        "          </tr>\n"
+        "        </thead>\n"
+        "        <tbody>\n"
+        + "\n".join(rows)
+        + "\n        </tbody>\n"
+        "      </table>\n"
+    )
+
+
+def synthetic_events(years, seed=1):
+    # Weekly club nights over several years (in shuffled feed order), plus
+    # cancellations, no-dance evenings and late events around DST switches.
+    rng = random.Random(seed)
+    events = []
+    day = date(2026 - years, 1, 1)
+    end = date(2026, 12, 31)
+    while day <= end:
+        for hour, minute in ((17, 30), (18, 30), (23, 30), (0, 30)):
+            if rng.random() < 0.5:
+                continue
+            details = rng.choice([
+                "Clubabend",
+                "Clubabend - abgesagt",
+                "Kein Tanzen: Sommerpause",
+                "Special Dance",
+                "Gastabend",
+            ])
+            end_day = day + timedelta(days=1) if hour == 23 else day
+            events.append({
+                "date": day.isoformat(),
+                "time": f"{hour:02d}:{minute:02d}",
+                "end_date": end_day.isoformat(),
+                "end_time": f"{(hour + 2) % 24:02d}:{minute:02d}",
+                "details": details,
+                "location": "Gemeindehaus, Ohmoorring 1, Hamburg",
+                "caller": "Caller " + str(rng.randrange(10)),
+            })
+        day += timedelta(days=rng.choice((3, 4)))
+    rng.shuffle(events)
+    return events
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-call and parse-once schedule rendering.")
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "events.json"
+        path.write_text(json.dumps(synthetic_events(args.years)), encoding="utf-8")
+
+        def reference():
+            return render_table_reference(load_events_reference(path))
+
+        def current():
+            generate_schedule.local_offset.cache_clear()
+            generate_schedule.format_day_de.cache_clear()
+            return generate_schedule.render_table(generate_schedule.load_events(path))
+
+        expected = reference()
+        if current() != expected:
+            raise SystemExit("Schedule output differs from the reference implementation")
+
+        timings = {}
+        for name, func in (("reference", reference), ("parse-once", current)):
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                func()
+            timings[name] = (time.perf_counter() - start) / args.repeat
+
+    count = expected.count("<tr") - 1
+    print(f"{count} events over {args.years} years")
+    for name, seconds in timings.items():
+        print(f"{name:<10}: {seconds * 1e3:8.1f} ms per render, {seconds / count * 1e6:6.2f} us/event")
+
+
+if __name__ == "__main__":
+    main()
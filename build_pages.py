@@ -1,14 +1,68 @@
+import argparse
+import functools
+import hashlib
+import importlib.util
+import json
 import re
+import shutil
 import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
 
+import render_news
+from fileio import file_record, load_json_object, replacing, write_if_changed
+from precompress import precompress, precompress_tree
 
-INCLUDE_TOKEN = "{{ include: nav.html }}"
-FOOTER_TOKEN = "{{ include: footer.html }}"
+
+DIRECTIVE_PATTERN = re.compile(r"\{\{\s*(include|render):\s*([^\s{}]+)\s*\}\}")
+# Generated fragments are tracked in the manifest as "render:<name>" deps.
+RENDER_PREFIX = "render:"
 ACTIVE_CLASS = "active"
+# Top-level partials; anything under PARTIALS_DIR is a partial as well.
+PARTIALS = {"nav.html", "footer.html"}
+PARTIALS_DIR = "partials"
+# Partials whose links get the active class for the page they are rendered into.
+NAV_PARTIALS = {"nav.html"}
+GALLERY_DIR = "gallery-pics"
+GALLERY_MANIFEST = "gallery.json"
+GALLERY_SCRIPT = Path(__file__).resolve().parent / "scripts" / "build_gallery_manifest.py"
+WATCH_INTERVAL = 0.5
+# Assets referenced from pages are copied a second time under a content-hashed
+# name (style.<hash>.css) that can be cached as immutable.
+FINGERPRINT_EXTENSIONS = {
+    ".css",
+    ".js",
+    ".png",
+    ".jpg",
+    ".jpeg",
+    ".gif",
+    ".webp",
+    ".avif",
+    ".svg",
+    ".ico",
+}
+# gallery-pics is listed dynamically via gallery.json and documents are linked
+# from news.json and external sites, so both keep their plain names only.
+UNHASHED_DIRS = {GALLERY_DIR, "documents", PARTIALS_DIR}
+FINGERPRINT_LENGTH = 10
+ASSET_MANIFEST = "asset-manifest.json"
+ASSET_URL_PATTERN = re.compile(r"(?<![\w-])(src|href)=([\"'])([^\"']+)\2")
+MANIFEST_NAME = ".build-manifest.json"
+MANIFEST_VERSION = 2
+SCRIPT_PATH = Path(__file__).resolve()
+SCHEDULE_SCRIPT = SCRIPT_PATH.parent / "generate_schedule.py"
+NEWS_SCRIPT = SCRIPT_PATH.parent / "render_news.py"
+NEWS_JSON = "news.json"
 
 
-def mark_active(nav_html, page_name):
+NAV_LINK_PATTERN = re.compile(r"<a[^>]*>")
+HREF_PATTERN = re.compile(r"href=[\"']([^\"']*)[\"']")
+
+
+def activate_link(tag, page_name):
     pattern = re.compile(rf"<a([^>]*?)href=[\"']{re.escape(page_name)}[\"']([^>]*)>")
 
     def repl(match):
@@ -26,32 +80,683 @@ def mark_active(nav_html, page_name):
             )
         return f"<a{attrs_before}href=\"{page_name}\" class=\"{ACTIVE_CLASS}\"{attrs_after}>"
 
-    return pattern.sub(repl, nav_html)
+    return pattern.sub(repl, tag)
 
 
-def main(argv):
-    if len(argv) != 3:
-        raise SystemExit("Usage: build_pages.py static/ _site/")
-    static_dir = Path(argv[1])
-    site_dir = Path(argv[2])
-    nav_path = static_dir / "nav.html"
-    footer_path = static_dir / "footer.html"
-    if not nav_path.exists():
-        raise SystemExit("Missing static/nav.html")
-    nav_html = nav_path.read_text(encoding="utf-8")
-    footer_html = footer_path.read_text(encoding="utf-8") if footer_path.exists() else ""
-
-    for page in static_dir.glob("*.html"):
-        if page.name in {"nav.html", "footer.html"}:
+# The nav is split once into literal parts and anchor slots keyed by href, so
+# marking the active link for a page is a list join instead of a regex pass.
+class NavTemplate:
+    def __init__(self, nav_html):
+        self.parts = []
+        self.slots = {}
+        self._rendered = {}
+        pos = 0
+        for match in NAV_LINK_PATTERN.finditer(nav_html):
+            tag = match.group(0)
+            hrefs = {m.group(1) for m in HREF_PATTERN.finditer(tag)}
+            if not hrefs:
+                continue
+            self.parts.append(nav_html[pos : match.start()])
+            index = len(self.parts)
+            self.parts.append(tag)
+            for href in hrefs:
+                active_tag = activate_link(tag, href)
+                if active_tag != tag:
+                    self.slots.setdefault(href, []).append((index, active_tag))
+            pos = match.end()
+        self.parts.append(nav_html[pos:])
+
+    def render(self, page_name):
+        html = self._rendered.get(page_name)
+        if html is None:
+            parts = list(self.parts)
+            for index, active_tag in self.slots.get(page_name, ()):
+                parts[index] = active_tag
+            html = self._rendered[page_name] = "".join(parts)
+        return html
+
+
+@functools.lru_cache(maxsize=8)
+def nav_template(nav_html):
+    return NavTemplate(nav_html)
+
+
+def mark_active(nav_html, page_name):
+    return nav_template(nav_html).render(page_name)
+
+
+def same_stat(path, record):
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return False
+    return (
+        record is not None
+        and record.get("size") == stat.st_size
+        and record.get("mtime_ns") == stat.st_mtime_ns
+    )
+
+
+def load_manifest(path):
+    data = load_json_object(path)
+    return data if data.get("version") == MANIFEST_VERSION else {}
+
+
+def is_page(static_dir, path):
+    return path.parent == static_dir and path.suffix == ".html" and path.name not in PARTIALS
+
+
+def is_partial_dir(static_dir, path):
+    return path.relative_to(static_dir).parts[0] == PARTIALS_DIR
+
+
+def is_gallery_asset(rel):
+    # Published by scripts/build_gallery_manifest.py, which strips EXIF (GPS
+    # positions and the like) from the photos on the way.
+    return Path(rel).parts[0] == GALLERY_DIR
+
+
+def is_fingerprinted(rel):
+    path = Path(rel)
+    return path.suffix.lower() in FINGERPRINT_EXTENSIONS and path.parts[0] not in UNHASHED_DIRS
+
+
+def fingerprint_name(rel, digest):
+    path = Path(rel)
+    return path.with_name(f"{path.stem}.{digest[:FINGERPRINT_LENGTH]}{path.suffix}").as_posix()
+
+
+def sync_assets(static_dir, site_dir, previous_assets):
+    assets = {}
+    copied = 0
+    for src in sorted(static_dir.rglob("*")):
+        if not src.is_file() or is_page(static_dir, src) or is_partial_dir(static_dir, src):
+            continue
+        rel = src.relative_to(static_dir).as_posix()
+        if is_gallery_asset(rel):
             continue
-        html = page.read_text(encoding="utf-8")
-        if INCLUDE_TOKEN in html:
-            html = html.replace(INCLUDE_TOKEN, mark_active(nav_html, page.name))
-        if FOOTER_TOKEN in html:
-            if not footer_html:
-                raise SystemExit("Missing static/footer.html")
-            html = html.replace(FOOTER_TOKEN, footer_html)
-        (site_dir / page.name).write_text(html, encoding="utf-8")
+        if is_fingerprinted(rel):
+            record = file_record(src, previous_assets.get(rel))
+            record = {**record, "fingerprint": fingerprint_name(rel, record["sha256"])}
+        else:
+            src_stat = src.stat()
+            record = {"size": src_stat.st_size, "mtime_ns": src_stat.st_mtime_ns}
+        assets[rel] = record
+        # copy2 keeps the source mtime, so an unchanged asset matches on stat alone.
+        targets = [rel, record["fingerprint"]] if "fingerprint" in record else [rel]
+        for target in targets:
+            dest = site_dir / target
+            if same_stat(dest, record):
+                continue
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            with replacing(dest) as tmp_path:
+                shutil.copy2(src, tmp_path)
+            copied += 1
+
+    current = {target for record in assets.values() for target in output_names(record)}
+    for record in previous_assets.values():
+        for target in set(output_names(record)) - current:
+            (site_dir / target).unlink(missing_ok=True)
+    for rel in sorted(set(previous_assets) - set(assets)):
+        if not is_gallery_asset(rel):
+            (site_dir / rel).unlink(missing_ok=True)
+    return assets, copied
+
+
+def output_names(record):
+    return [record["fingerprint"]] if "fingerprint" in record else []
+
+
+def asset_map_from(assets):
+    return {rel: record["fingerprint"] for rel, record in assets.items() if "fingerprint" in record}
+
+
+def rewrite_asset_urls(html, asset_map):
+    if not asset_map:
+        return html
+
+    def repl(match):
+        target = asset_map.get(match.group(3))
+        if target is None:
+            return match.group(0)
+        return f"{match.group(1)}={match.group(2)}{target}{match.group(2)}"
+
+    return ASSET_URL_PATTERN.sub(repl, html)
+
+
+class BuildError(ValueError):
+    pass
+
+
+class Include:
+    __slots__ = ("name",)
+
+    def __init__(self, name):
+        self.name = name
+
+
+class Render:
+    __slots__ = ("name",)
+
+    def __init__(self, name):
+        self.name = name
+
+
+def parse_template(text):
+    parts = []
+    pos = 0
+    for match in DIRECTIVE_PATTERN.finditer(text):
+        if match.start() > pos:
+            parts.append(text[pos : match.start()])
+        kind, name = match.groups()
+        parts.append(Include(name) if kind == "include" else Render(name))
+        pos = match.end()
+    if pos < len(text):
+        parts.append(text[pos:])
+    return parts
+
+
+class TemplateEngine:
+    def __init__(self, static_dir):
+        self.static_dir = static_dir
+        self.parsed = {}
+        self.digests = {}
+        self.flattened = {}
+        # Fragment name -> (input digest, html); None marks a failed fragment.
+        self.fragments = {}
+        self.asset_map = {}
+
+    def invalidate(self, names):
+        for name in names:
+            self.parsed.pop(name, None)
+            self.digests.pop(name, None)
+        self.flattened.clear()
+
+    def load(self, name, cache=True):
+        parts = self.parsed.get(name)
+        if parts is not None:
+            return parts
+        path = self.static_dir / name
+        if Path(name).is_absolute() or ".." in Path(name).parts:
+            raise BuildError(f"Include outside {self.static_dir}: {name}")
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            raise BuildError(f"Missing {path}") from None
+        self.digests[name] = hashlib.sha256(data).hexdigest()
+        parts = parse_template(data.decode("utf-8"))
+        if cache:
+            self.parsed[name] = parts
+        return parts
+
+    def flatten(self, name, stack):
+        if name in stack:
+            raise BuildError("Include cycle: " + " -> ".join((*stack, name)))
+        cached = self.flattened.get(name)
+        if cached is None:
+            chunks = []
+            deps = {name}
+            for part in self.load(name):
+                if isinstance(part, Include):
+                    html, part_deps = self.flatten(part.name, (*stack, name))
+                    chunks.append(html)
+                    deps.update(part_deps)
+                elif isinstance(part, Render):
+                    raise BuildError(f"{name}: render directives are only allowed in pages")
+                else:
+                    chunks.append(part)
+            cached = self.flattened[name] = ("".join(chunks), frozenset(deps))
+        return cached
+
+    def render(self, page_name):
+        chunks = []
+        deps = set()
+        digests = {}
+        for part in self.load(page_name, cache=False):
+            if isinstance(part, Include):
+                html, part_deps = self.flatten(part.name, (page_name,))
+                if part.name in NAV_PARTIALS:
+                    html = mark_active(html, page_name)
+                chunks.append(html)
+                deps.update(part_deps)
+            elif isinstance(part, Render):
+                if part.name not in self.fragments:
+                    raise BuildError(f"Unknown fragment '{part.name}' in {page_name}")
+                fragment = self.fragments[part.name]
+                if fragment is None:
+                    raise BuildError(f"Fragment '{part.name}' could not be rendered")
+                digests[f"{RENDER_PREFIX}{part.name}"] = fragment[0]
+                chunks.append(fragment[1])
+            else:
+                chunks.append(part)
+        digests.update((dep, self.digests[dep]) for dep in deps)
+        html = rewrite_asset_urls("".join(chunks), self.asset_map)
+        return html, dict(sorted(digests.items()))
+
+
+# Template engine shared by every render job; set once per worker process.
+_shared = {}
+
+
+def init_worker(engine):
+    _shared["engine"] = engine
+
+
+def render_job(page_name, out_path):
+    try:
+        html, deps = _shared["engine"].render(page_name)
+        return write_if_changed(out_path, html.encode("utf-8")), deps, None
+    except (BuildError, OSError, ValueError) as exc:
+        # UnicodeDecodeError is a ValueError: a page that is not UTF-8 fails alone.
+        return False, None, f"{page_name}: {exc}"
+
+
+def run_jobs(jobs, page_names, out_paths, engine):
+    if jobs <= 1 or len(page_names) <= 1:
+        init_worker(engine)
+        return list(map(render_job, page_names, out_paths))
+    with ProcessPoolExecutor(
+        max_workers=min(jobs, len(page_names)),
+        initializer=init_worker,
+        initargs=(engine,),
+    ) as pool:
+        # map() yields results in submission order, so reporting stays deterministic.
+        return list(pool.map(render_job, page_names, out_paths))
+
+
+@functools.lru_cache(maxsize=1)
+def schedule_parts(events_path, stamp):
+    # Table and JSON-LD come from one pass over events.json; stamp (mtime,
+    # size) keeps --watch from reusing a stale render.
+    # generate_schedule imports build_pages, so it is only imported on demand.
+    import generate_schedule
+
+    structured = []
+    table = generate_schedule.render_table(generate_schedule.load_events(events_path), structured)
+    return table, generate_schedule.render_jsonld(structured)
+
+
+def render_schedule_fragment(events_path, part=0):
+    stat = Path(events_path).stat()
+    return schedule_parts(str(events_path), (stat.st_mtime_ns, stat.st_size))[part]
+
+
+def render_schedule_rules():
+    import generate_schedule
+
+    return generate_schedule.render_rules_script()
+
+
+def render_news_fragment(render, news_path, today):
+    return render(render_news.load_news(news_path), today)
+
+
+def fragment_sources(static_dir, events_path=None, news_path=None):
+    # Fragment name -> (input files, extra key, render function) for
+    # {{ render: name }}. The extra key covers inputs that are not files.
+    sources = {}
+    if events_path:
+        events_path = Path(events_path)
+        sources["schedule"] = (
+            (events_path, SCHEDULE_SCRIPT),
+            "",
+            functools.partial(render_schedule_fragment, events_path),
+        )
+        sources["schedule-jsonld"] = (
+            (events_path, SCHEDULE_SCRIPT),
+            "",
+            functools.partial(render_schedule_fragment, events_path, 1),
+        )
+    else:
+        # Without events.json the schedule is left to the client.
+        for name in ("schedule", "schedule-jsonld"):
+            sources[name] = ((), "", lambda: "")
+    # The badge rules only depend on generate_schedule.py itself.
+    sources["schedule-rules"] = ((SCHEDULE_SCRIPT,), "", render_schedule_rules)
+    news_path = Path(news_path) if news_path else static_dir / NEWS_JSON
+    # Publication windows are evaluated for the current day in Berlin; keying
+    # on the visible items re-renders only when a window opens or closes.
+    today = render_news.berlin_today_key()
+    try:
+        visible = render_news.visibility(render_news.load_news(news_path), today)
+    except (OSError, ValueError):
+        visible = {}
+    for name, render in (
+        ("news-list", render_news.render_news_list),
+        ("news-featured", render_news.render_featured),
+    ):
+        sources[name] = (
+            (news_path, NEWS_SCRIPT),
+            json.dumps(visible.get(name, today)),
+            functools.partial(render_news_fragment, render, news_path, today),
+        )
+    return sources
+
+
+def render_fragments(engine, sources, digest_for, errors):
+    for name, (_, _, render) in sorted(sources.items()):
+        try:
+            engine.fragments[name] = (digest_for(name), render())
+        except (OSError, ValueError, KeyError) as exc:
+            engine.fragments[name] = None
+            errors.append(f"render: {name}: {exc}")
+
+
+def warm_partials(engine):
+    for name in sorted(PARTIALS):
+        try:
+            engine.flatten(name, ())
+        except (BuildError, OSError, ValueError):
+            pass
+
+
+def build(
+    static_dir,
+    site_dir,
+    force=False,
+    jobs=1,
+    engine=None,
+    events_path=None,
+    news_path=None,
+):
+    site_dir.mkdir(parents=True, exist_ok=True)
+
+    manifest_path = site_dir / MANIFEST_NAME
+    previous = {} if force else load_manifest(manifest_path)
+    previous_inputs = previous.get("inputs", {})
+    previous_pages = previous.get("pages", {})
+    fragments = fragment_sources(static_dir, events_path, news_path)
+
+    inputs = {}
+
+    def input_digest(name, path):
+        if name not in inputs:
+            if not path.exists():
+                return None
+            inputs[name] = file_record(path, previous_inputs.get(name))
+        return inputs[name]["sha256"]
+
+    def fragment_digest(name):
+        if name not in fragments:
+            return ""
+        files, key, _ = fragments[name]
+        joined = "\n".join([key, *(input_digest(str(path), path) or "" for path in files)])
+        return hashlib.sha256(joined.encode("utf-8")).hexdigest()
+
+    def dep_digest(dep):
+        if dep.startswith(RENDER_PREFIX):
+            return fragment_digest(dep[len(RENDER_PREFIX) :])
+        return input_digest(dep, static_dir / dep)
+
+    script_changed = input_digest("build_pages.py", SCRIPT_PATH) != previous_inputs.get(
+        "build_pages.py", {}
+    ).get("sha256")
+
+    assets, copied = sync_assets(static_dir, site_dir, previous.get("assets", {}))
+    asset_map = asset_map_from(assets)
+    asset_map_json = json.dumps(asset_map, indent=2, sort_keys=True) + "\n"
+    asset_map_digest = hashlib.sha256(asset_map_json.encode("utf-8")).hexdigest()
+    write_if_changed(site_dir / ASSET_MANIFEST, asset_map_json.encode("utf-8"))
+    # Every page references fingerprinted names, so a new hash re-renders all.
+    script_changed = script_changed or asset_map_digest != previous.get("asset_map_sha256")
+
+    pages = {}
+    sources = {}
+    stale = []
+    for page in sorted(static_dir.glob("*.html")):
+        if not is_page(static_dir, page):
+            continue
+        prev_page = previous_pages.get(page.name, {})
+        source = sources[page.name] = file_record(page, prev_page.get("source"))
+        deps = prev_page.get("deps")
+        if (
+            not script_changed
+            and deps is not None
+            and source["sha256"] == prev_page.get("source", {}).get("sha256")
+            and same_stat(site_dir / page.name, prev_page.get("output"))
+            and all(dep_digest(dep) == digest for dep, digest in deps.items())
+        ):
+            pages[page.name] = prev_page
+        else:
+            stale.append(page.name)
+
+    written = 0
+    errors = []
+    if stale:
+        # Parse the shared partials and render fragments once here; workers
+        # receive the warm engine.
+        engine = engine or TemplateEngine(static_dir)
+        engine.asset_map = asset_map
+        warm_partials(engine)
+        render_fragments(engine, fragments, fragment_digest, errors)
+        out_paths = [site_dir / name for name in stale]
+        results = run_jobs(jobs, stale, out_paths, engine)
+        for name, out_path, (changed, deps, error) in zip(stale, out_paths, results):
+            if error:
+                errors.append(error)
+                continue
+            written += changed
+            for dep in deps:
+                dep_digest(dep)
+            out_stat = out_path.stat()
+            pages[name] = {
+                "source": sources[name],
+                "deps": deps,
+                "output": {"size": out_stat.st_size, "mtime_ns": out_stat.st_mtime_ns},
+            }
+
+    for name in sorted(set(previous_pages) - set(sources)):
+        (site_dir / name).unlink(missing_ok=True)
+
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "inputs": inputs,
+        "pages": pages,
+        "assets": assets,
+        "asset_map_sha256": asset_map_digest,
+    }
+    write_if_changed(manifest_path, (json.dumps(manifest, indent=2, sort_keys=True) + "\n").encode("utf-8"))
+    compressed = precompress_tree(site_dir)
+    print(
+        f"Updated {written} of {len(sources)} pages, copied {copied} assets, "
+        f"compressed {compressed} files in {site_dir}"
+    )
+    if errors:
+        raise SystemExit(f"{len(errors)} page(s) failed:\n" + "\n".join(errors))
+
+
+def pages_with_fragments(static_dir, fragment_names):
+    pages = []
+    engine = TemplateEngine(static_dir)
+    for page in sorted(static_dir.glob("*.html")):
+        if not is_page(static_dir, page):
+            continue
+        parts = engine.load(page.name, cache=False)
+        if any(isinstance(part, Render) and part.name in fragment_names for part in parts):
+            pages.append(page.name)
+    return pages
+
+
+def render_pages(static_dir, out_dir, page_names, events_path=None, news_path=None):
+    # Re-render selected pages straight into a deploy directory: no asset
+    # sync and no build manifest, every file is swapped in atomically.
+    out_dir.mkdir(parents=True, exist_ok=True)
+    engine = TemplateEngine(static_dir)
+    # Use the fingerprinted names of the build that is deployed in out_dir.
+    engine.asset_map = load_json_object(out_dir / ASSET_MANIFEST)
+    errors = []
+    render_fragments(
+        engine, fragment_sources(static_dir, events_path, news_path), lambda name: "", errors
+    )
+    init_worker(engine)
+    for name in page_names:
+        _, _, error = render_job(name, out_dir / name)
+        if error:
+            errors.append(error)
+        else:
+            precompress(out_dir / name)
+    if errors:
+        raise BuildError(f"{len(errors)} page(s) failed:\n" + "\n".join(errors))
+    print(f"Rendered {', '.join(page_names)} to {out_dir}")
+
+
+def load_gallery_builder():
+    spec = importlib.util.spec_from_file_location("build_gallery_manifest", GALLERY_SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    # Registered so its worker function can be pickled for the process pool.
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def snapshot(static_dir, extra_files=()):
+    # extra_files are inputs outside static_dir (events.json, news.json); they
+    # are keyed by their path, which never clashes with a name in static_dir.
+    state = {}
+    for path in static_dir.rglob("*"):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        if not path.is_dir():
+            state[path.relative_to(static_dir).as_posix()] = (stat.st_size, stat.st_mtime_ns)
+    for path in extra_files:
+        try:
+            stat = Path(path).stat()
+        except FileNotFoundError:
+            continue
+        state[str(path)] = (stat.st_size, stat.st_mtime_ns)
+    return state
+
+
+def serve(site_dir, host, port):
+    handler = functools.partial(SimpleHTTPRequestHandler, directory=str(site_dir))
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Serving {site_dir} on http://{host}:{port}")
+    return server
+
+
+def watch(static_dir, site_dir, jobs, host, port, events_path=None, news_path=None):
+    gallery = load_gallery_builder()
+    gallery_output = site_dir / GALLERY_DIR / GALLERY_MANIFEST
+    engine = TemplateEngine(static_dir)
+    rebuild = functools.partial(
+        build,
+        static_dir,
+        site_dir,
+        jobs=jobs,
+        engine=engine,
+        events_path=events_path,
+        news_path=news_path,
+    )
+    data_files = [Path(path) for path in (events_path, news_path) if path]
+    try:
+        rebuild()
+    except SystemExit as exc:
+        print(exc)
+    gallery.write_manifest(static_dir / GALLERY_DIR, gallery_output, jobs=jobs)
+    server = serve(site_dir, host, port)
+
+    state = snapshot(static_dir, data_files)
+    print(f"Watching {static_dir} for changes (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(WATCH_INTERVAL)
+            current = snapshot(static_dir, data_files)
+            changed = {
+                name
+                for name in state.keys() | current.keys()
+                if state.get(name) != current.get(name)
+            }
+            state = current
+            if not changed:
+                continue
+            # The build manifest limits re-rendering to pages whose source,
+            # partials or data files changed. Photos are not build inputs (the
+            # asset sync skips gallery-pics), so a gallery-only change just
+            # rewrites the gallery manifest.
+            gallery_changed = {name for name in changed if name.startswith(f"{GALLERY_DIR}/")}
+            if changed - gallery_changed:
+                engine.invalidate(changed)
+                try:
+                    rebuild()
+                except SystemExit as exc:
+                    print(exc)
+            if gallery_changed:
+                count = gallery.write_manifest(static_dir / GALLERY_DIR, gallery_output, jobs=jobs)
+                print(f"Wrote {count} gallery items to {gallery_output}")
+    except KeyboardInterrupt:
+        print("\nStopped.")
+    finally:
+        server.shutdown()
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Render static pages with shared includes.")
+    parser.add_argument("static_dir", help="Source directory, e.g. static/")
+    parser.add_argument("site_dir", help="Output directory, e.g. _site/")
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Ignore the build manifest and render every page",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of worker processes for rendering pages (default: 1)",
+    )
+    parser.add_argument(
+        "--events",
+        help="events.json used to pre-render {{ render: schedule }}",
+    )
+    parser.add_argument(
+        "--news",
+        help="news.json used to pre-render the news fragments (default: static_dir/news.json)",
+    )
+    parser.add_argument(
+        "--page",
+        action="append",
+        dest="pages",
+        metavar="PAGE",
+        help="Only render this page into site_dir (repeatable; no asset sync, no manifest)",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running, rebuild on changes and serve site_dir",
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="Bind host for --watch")
+    parser.add_argument("--port", type=int, default=8000, help="Bind port for --watch")
+    args = parser.parse_args(argv[1:])
+    if args.pages:
+        try:
+            render_pages(
+                Path(args.static_dir), Path(args.site_dir), args.pages, args.events, args.news
+            )
+        except BuildError as exc:
+            raise SystemExit(str(exc)) from None
+        return
+    if args.watch:
+        watch(
+            Path(args.static_dir),
+            Path(args.site_dir),
+            args.jobs,
+            args.host,
+            args.port,
+            args.events,
+            args.news,
+        )
+        return
+    build(
+        Path(args.static_dir),
+        Path(args.site_dir),
+        force=args.force,
+        jobs=args.jobs,
+        events_path=args.events,
+        news_path=args.news,
+    )
 
 
 if __name__ == "__main__":
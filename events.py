@@ -1,29 +1,455 @@
-from icalevents.icalevents import events
+import argparse
 import datetime
+import hashlib
+import http.client
 import json
-import pytz
+import os
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from pathlib import Path
 
-eight_weeks = datetime.timedelta(weeks=8)
-dt = datetime.datetime.today() - datetime.timedelta(days=1)
-in_eight_weeks = dt + eight_weeks
-es = events("webcal://p190-caldav.icloud.com/published/2/MTAzODAyMzk0NDkxMDM4MKx0EePtPDXePVZMEANU5wgUu2pulPBIXFjbmygZOk5T6UHRODe5vW8hjQKi2TbeU3u3b1jCZ6Y3QSjjDi81k3g", start=dt, end=in_eight_weeks, sort=True, fix_apple=True)
+from fileio import file_sha256, load_json_object, write_atomic, write_json
 
-events_json = []
-utc_timezone = pytz.UTC
+CALENDAR_URL = "webcal://p190-caldav.icloud.com/published/2/MTAzODAyMzk0NDkxMDM4MKx0EePtPDXePVZMEANU5wgUu2pulPBIXFjbmygZOk5T6UHRODe5vW8hjQKi2TbeU3u3b1jCZ6Y3QSjjDi81k3g"
+DEFAULT_CONFIG = Path(__file__).resolve().parent / "calendars.json"
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent / ".cache" / "events"
+DEFAULT_OUTPUT = "events.json"
+DEFAULT_WEEKS = 8
+FETCH_TIMEOUT = 30
+READ_CHUNK = 1 << 16
+EVENT_FIELDS = ("date", "time", "end_date", "end_time", "details", "location", "caller")
+# Exit status when events.json was left untouched: the feed answered 304 or
+# the regenerated content equals the deployed file.
+EXIT_UNCHANGED = 3
 
-for e in es:
-    start_utc = e.start.astimezone(utc_timezone)
-    end_utc = e.end.astimezone(utc_timezone)
-    event = {
+
+def is_url(source):
+    return "://" in str(source)
+
+
+def http_url(url):
+    if url.startswith("webcal://"):
+        return "https://" + url[len("webcal://"):]
+    return url
+
+
+def cache_paths(cache_dir, url):
+    key = hashlib.sha256(url.encode("utf-8")).hexdigest()[:16]
+    return cache_dir / f"{key}.ics", cache_dir / f"{key}.json"
+
+
+def fetch_calendar(url, cache_dir, timeout=FETCH_TIMEOUT):
+    # Conditional GET against the cached copy. Returns the path of the cached
+    # feed, whether it changed since the last fetch, and the cache metadata.
+    body_path, meta_path = cache_paths(cache_dir, url)
+    meta = load_json_object(meta_path) if body_path.exists() else {}
+    request = urllib.request.Request(http_url(url), headers={"User-Agent": "ohmoors-events"})
+    if meta.get("etag"):
+        request.add_header("If-None-Match", meta["etag"])
+    if meta.get("last_modified"):
+        request.add_header("If-Modified-Since", meta["last_modified"])
+    # timeout bounds each socket operation in urlopen; the deadline bounds the
+    # whole download, so a server trickling bytes cannot stretch a refresh.
+    deadline = time.monotonic() + timeout
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            chunks = []
+            for chunk in iter(lambda: response.read1(READ_CHUNK), b""):
+                chunks.append(chunk)
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"feed not complete within {timeout} s")
+            body = b"".join(chunks)
+            headers = response.headers
+    except urllib.error.HTTPError as exc:
+        if exc.code == 304 and meta:
+            return body_path, False, meta
+        raise
+
+    write_atomic(body_path, body)
+    meta = {
+        "url": url,
+        "etag": headers.get("ETag", ""),
+        "last_modified": headers.get("Last-Modified", ""),
+    }
+    write_json(meta_path, meta)
+    return body_path, True, meta
+
+
+def load_calendar(source, cache_dir=DEFAULT_CACHE_DIR, timeout=FETCH_TIMEOUT):
+    # Local files are always treated as modified; URLs go through the cache.
+    if not is_url(source):
+        return Path(source), True, {}
+    return fetch_calendar(source, Path(cache_dir), timeout)
+
+
+def source_entry(value):
+    if isinstance(value, dict):
+        entry = dict(value)
+    else:
+        entry = {"url": str(value)}
+    if not entry.get("url"):
+        raise ValueError(f"Calendar source without url: {value!r}")
+    entry.setdefault("name", entry["url"])
+    entry.setdefault("timeout", FETCH_TIMEOUT)
+    entry.setdefault("required", False)
+    return entry
+
+
+def load_sources(config_path=DEFAULT_CONFIG):
+    # calendars.json lists the feeds to merge; without it only the club
+    # calendar is used.
+    try:
+        with open(config_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return [source_entry({"name": "ohmoor", "url": CALENDAR_URL, "required": True})]
+    if not isinstance(data, list) or not data:
+        raise ValueError(f"{config_path} must be a non-empty list of calendar sources")
+    return [source_entry(item) for item in data]
+
+
+def cached_source(source, cache_dir, exc):
+    # A source that cannot be fetched falls back to its last cached copy; one
+    # without any copy is dropped unless it is required.
+    body_path, meta_path = cache_paths(Path(cache_dir), source["url"])
+    if body_path.exists():
+        print(f"WARN: {source['name']}: {exc}; using cached copy.", file=sys.stderr)
+        return body_path, False, load_json_object(meta_path)
+    if source["required"]:
+        raise exc
+    print(f"WARN: {source['name']}: {exc}; skipped.", file=sys.stderr)
+    return None, False, {}
+
+
+def load_sources_concurrently(sources, cache_dir=DEFAULT_CACHE_DIR):
+    # One thread per source, so a refresh takes as long as the slowest feed,
+    # but no longer than that feed's timeout: urlopen's timeout only bounds
+    # single socket operations (and not the DNS lookup), so a source still
+    # loading at its deadline falls back to the cache like a failed one. Its
+    # thread is not waited for; the deadline in fetch_calendar ends it soon
+    # after. Should it still refresh the cache, that meta lacks the window
+    # key, so the next run parses the new copy.
+    started = time.monotonic()
+    pool = ThreadPoolExecutor(max_workers=len(sources))
+    try:
+        futures = [
+            pool.submit(load_calendar, source["url"], cache_dir, source["timeout"])
+            for source in sources
+        ]
+        loaded = []
+        for source, future in zip(sources, futures):
+            remaining = max(started + source["timeout"] - time.monotonic(), 0)
+            try:
+                loaded.append(future.result(timeout=remaining))
+            except (OSError, http.client.HTTPException, FutureTimeoutError) as exc:
+                if not future.done():
+                    exc = TimeoutError(f"no response within {source['timeout']} s")
+                loaded.append(cached_source(source, cache_dir, exc))
+        return loaded
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def feed_uids(path):
+    # The UIDs written in the feed. icalevents makes up a random one for
+    # events without a (plain ASCII) UID, which only this tells apart.
+    uids = set()
+    current = None
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            line = line.rstrip("\r\n")
+            if line[:1] in (" ", "\t"):
+                if current is not None:
+                    current += line[1:]
+                continue
+            if current is not None:
+                uids.add(current)
+            name, sep, value = line.partition(":")
+            current = value if sep and name.split(";", 1)[0].upper() == "UID" else None
+    if current is not None:
+        uids.add(current)
+    return uids
+
+
+def fallback_uid(event):
+    # Stable stand-in for a missing UID, so the store and the diff see the
+    # same event on every run.
+    start = event.start.astimezone(datetime.timezone.utc).isoformat()
+    payload = "\n".join((event.summary or "", start, event.location or ""))
+    return f"nouid-{hashlib.sha1(payload.encode('utf-8')).hexdigest()}"
+
+
+def with_stable_uids(events, known=None):
+    for event in events:
+        if not event.uid or (known is not None and event.uid not in known):
+            event.uid = fallback_uid(event)
+    return events
+
+
+def parse_calendar(path, start, end, parser="icalevents"):
+    if parser == "stream":
+        from ical_stream import events_from_file
+
+        return with_stable_uids(events_from_file(path, start, end))
+    from icalevents.icalevents import events
+
+    found = events(file=str(path), start=start, end=end, sort=True, fix_apple=True)
+    return with_stable_uids(found, feed_uids(path))
+
+
+def merge_events(event_lists):
+    # The same event may appear in several feeds; the first source wins.
+    seen = set()
+    merged = []
+    for events in event_lists:
+        for event in events:
+            key = (event.uid, event.start.astimezone(datetime.timezone.utc)) if event.uid else None
+            if key is not None:
+                if key in seen:
+                    continue
+                seen.add(key)
+            merged.append(event)
+    return merged
+
+
+def parse_sources(loaded, start, end, parser="icalevents"):
+    with ThreadPoolExecutor(max_workers=len(loaded)) as pool:
+        return merge_events(pool.map(
+            lambda feed_path: parse_calendar(feed_path, start, end, parser) if feed_path else [],
+            [feed_path for feed_path, _, _ in loaded],
+        ))
+
+
+def fetch_events(url, start, end, parser="icalevents", cache_dir=DEFAULT_CACHE_DIR):
+    # url may also be a list of URLs or source entries, which are merged.
+    urls = url if isinstance(url, (list, tuple)) else [url]
+    sources = [source_entry(value) for value in urls]
+    return parse_sources(load_sources_concurrently(sources, cache_dir), start, end, parser)
+
+
+def serialize(events):
+    records = []
+    for e in events:
+        start_utc = e.start.astimezone(datetime.timezone.utc)
+        end_utc = e.end.astimezone(datetime.timezone.utc)
+        records.append({
             "date": start_utc.strftime("%Y-%m-%d"),
             "time": start_utc.strftime("%H:%M"),
             "end_date": end_utc.strftime("%Y-%m-%d"),
             "end_time": end_utc.strftime("%H:%M"),
             "details": e.summary,
             "location": e.location,
-            "caller": e.description
+            "caller": e.description,
+        })
+    return records
+
+
+def canonical_record(record):
+    return {field: record.get(field) for field in EVENT_FIELDS}
+
+
+def record_sort_key(record):
+    return tuple("" if record[field] is None else str(record[field]) for field in EVENT_FIELDS)
+
+
+def canonical_json(records):
+    # Fixed key order and a total sort order, so equal events give equal bytes.
+    ordered = sorted((canonical_record(record) for record in records), key=record_sort_key)
+    return json.dumps(ordered, ensure_ascii=False, indent=2).encode("utf-8")
+
+
+def load_records(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return []
+    return [record for record in data if isinstance(record, dict)] if isinstance(data, list) else []
+
+
+def slot_keys(records):
+    # Events are matched by start; several events in one slot by position.
+    seen = {}
+    keyed = {}
+    for record in sorted((canonical_record(record) for record in records), key=record_sort_key):
+        slot = (record["date"], record["time"])
+        index = seen.get(slot, 0)
+        seen[slot] = index + 1
+        keyed[(*slot, index)] = record
+    return keyed
+
+
+def diff_events(old_records, new_records):
+    old, new = slot_keys(old_records), slot_keys(new_records)
+    return {
+        "added": [new[key] for key in new if key not in old],
+        "removed": [old[key] for key in old if key not in new],
+        "changed": [
+            {"before": old[key], "after": new[key]}
+            for key in new
+            if key in old and old[key] != new[key]
+        ],
     }
-    events_json.append(event)
 
-with open("events.json", "w", encoding="utf-8") as f:
-    json.dump(events_json, f, ensure_ascii=False, indent=2)
\ No newline at end of file
+
+def diff_summary(diff):
+    return ", ".join(f"{len(diff[kind])} {kind}" for kind in ("added", "removed", "changed"))
+
+
+def write_events(records, output_path):
+    write_atomic(Path(output_path), canonical_json(records))
+
+
+def default_window(today=None):
+    start = (today or datetime.datetime.today()) - datetime.timedelta(days=1)
+    return start, start + datetime.timedelta(weeks=DEFAULT_WEEKS)
+
+
+def window_key(start, end):
+    return f"{start:%Y-%m-%d}..{end:%Y-%m-%d}"
+
+
+def update_events(
+    sources,
+    output_path,
+    start,
+    end,
+    parser="icalevents",
+    cache_dir=DEFAULT_CACHE_DIR,
+    force=False,
+    compare_path=None,
+    store_path=None,
+    ics_path=None,
+):
+    # Returns (written, diff). diff is None when no feed was modified since
+    # the output was last generated for this window; otherwise it lists the
+    # events added, removed and changed against compare_path (the output
+    # itself by default). Content equal to compare_path is not written. With
+    # store_path the refreshed window is also synced into the events store;
+    # with ics_path schedule.ics is written together with the output.
+    sources = [source_entry(value) for value in (sources if isinstance(sources, (list, tuple)) else [sources])]
+    loaded = load_sources_concurrently(sources, cache_dir)
+    # The window slides daily, so unchanged feeds only skip the parse when the
+    # output was already generated for the same window and the same sources.
+    urls = "\n".join(sorted(source["url"] for source in sources))
+    key = f"{window_key(start, end)} {hashlib.sha256(urls.encode('utf-8')).hexdigest()[:12]}"
+    if not force and all(
+        feed_path is not None and not modified and meta.get("window") == key
+        for feed_path, modified, meta in loaded
+    ):
+        return False, None
+    events = parse_sources(loaded, start, end, parser)
+    records = serialize(events)
+    items = list(zip((event.uid for event in events), records))
+    if store_path:
+        from events_store import EventStore
+
+        with EventStore(store_path) as store:
+            store.sync(start, end, items)
+    compare_path = Path(compare_path or output_path)
+    content = canonical_json(records)
+    diff = diff_events(load_records(compare_path), records)
+    written = (
+        force
+        or not compare_path.is_file()
+        or file_sha256(compare_path) != hashlib.sha256(content).hexdigest()
+    )
+    if written:
+        write_atomic(Path(output_path), content)
+        if ics_path:
+            from events_ics import render_ics
+
+            write_atomic(Path(ics_path), render_ics(items, start))
+    for source, (feed_path, _, meta) in zip(sources, loaded):
+        if feed_path is not None and is_url(source["url"]):
+            meta["window"] = key
+            write_json(cache_paths(Path(cache_dir), source["url"])[1], meta)
+    return written, diff
+
+
+def parse_date(value):
+    return datetime.datetime.combine(datetime.date.fromisoformat(value), datetime.time())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write events.json from the calendar feeds.")
+    parser.add_argument(
+        "--source",
+        "--url",
+        action="append",
+        dest="sources",
+        help="Calendar feed (webcal/https/http URL or local .ics file); repeatable, replaces --config",
+    )
+    parser.add_argument(
+        "--config",
+        default=DEFAULT_CONFIG,
+        help="JSON list of calendar sources (name, url, timeout, required)",
+    )
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Path of the events.json to write")
+    parser.add_argument("--start", type=parse_date, help="First day of the window (default: yesterday)")
+    parser.add_argument("--end", type=parse_date, help="End of the window, exclusive (default: start + --weeks)")
+    parser.add_argument("--weeks", type=int, default=DEFAULT_WEEKS, help="Window length without --end")
+    parser.add_argument(
+        "--cache-dir",
+        default=os.environ.get("EVENTS_CACHE_DIR", DEFAULT_CACHE_DIR),
+        help="Cache for the last feed body and its ETag/Last-Modified",
+    )
+    parser.add_argument(
+        "--parser",
+        choices=("icalevents", "stream"),
+        default="icalevents",
+        help="Feed parser; 'stream' reads the feed line by line and only expands the window",
+    )
+    parser.add_argument(
+        "--compare",
+        help="Deployed events.json to compare against (default: --output)",
+    )
+    parser.add_argument("--diff", help="Write the added/removed/changed summary as JSON here")
+    parser.add_argument(
+        "--store",
+        default=os.environ.get("EVENTS_STORE"),
+        help="SQLite events store to sync the refreshed window into (see events_store.py)",
+    )
+    parser.add_argument("--ics", help="Also write the subscribable schedule.ics here")
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Write events.json even if the feed or its content did not change",
+    )
+    args = parser.parse_args(argv)
+
+    start = args.start or default_window()[0]
+    end = args.end or start + datetime.timedelta(weeks=args.weeks)
+    if end <= start:
+        parser.error("--end must be after --start")
+    sources = args.sources or load_sources(args.config)
+    written, diff = update_events(
+        sources,
+        args.output,
+        start,
+        end,
+        args.parser,
+        args.cache_dir,
+        args.force,
+        args.compare,
+        args.store,
+        args.ics,
+    )
+    if diff is None:
+        print(f"INFO: Calendars not modified, {args.output} left unchanged (use --force to rewrite).")
+        return EXIT_UNCHANGED
+    if args.diff:
+        write_atomic(Path(args.diff), (json.dumps(diff, ensure_ascii=False, indent=2) + "\n").encode("utf-8"))
+    if not written:
+        print(f"INFO: Events unchanged, {args.output} not written.")
+        return EXIT_UNCHANGED
+    print(f"INFO: Events: {diff_summary(diff)}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+import hashlib
+
+from events import record_sort_key
+
+
+# schedule.ics for calendar subscriptions. It is written from the same
+# records as events.json, so only the published fields (time, details,
+# location, caller) reach it; attendees, organizer, alarms, URLs and the
+# feed's UIDs of the iCloud calendar stay private.
+CALENDAR_NAME = "Ohmoor Squeezers e.V. - Clubabende"
+PRODID = "-//Ohmoor Squeezers e.V.//Clubabende//DE"
+UID_DOMAIN = "ohmoor-squeezers.de"
+REFRESH_INTERVAL = "PT12H"
+LINE_LIMIT = 75
+
+
+def escape_text(value):
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def fold(line):
+    # Content lines are folded at 75 octets without splitting UTF-8 sequences.
+    data = line.encode("utf-8")
+    if len(data) <= LINE_LIMIT:
+        return line
+    parts = []
+    limit = LINE_LIMIT
+    while data:
+        cut = min(limit, len(data))
+        while cut < len(data) and (data[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(data[:cut].decode("utf-8"))
+        data = data[cut:]
+        # Continuation lines start with a space, which counts against the limit.
+        limit = LINE_LIMIT - 1
+    return "\r\n ".join(parts)
+
+
+def utc_stamp(date_str, time_str):
+    return f"{date_str.replace('-', '')}T{time_str.replace(':', '')}00Z"
+
+
+def event_uid(uid, record):
+    # Stable per occurrence without publishing the feed's own UID.
+    digest = hashlib.sha256(f"{uid}\n{record['date']}T{record['time']}".encode("utf-8")).hexdigest()
+    return f"{digest[:32]}@{UID_DOMAIN}"
+
+
+def event_lines(uid, record, stamp):
+    start = utc_stamp(record["date"], record["time"])
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:{event_uid(uid, record)}",
+        f"DTSTAMP:{stamp}",
+        f"DTSTART:{start}",
+        f"DTEND:{utc_stamp(record['end_date'], record['end_time'])}",
+    ]
+    if record.get("details"):
+        lines.append(f"SUMMARY:{escape_text(record['details'])}")
+    if record.get("location"):
+        lines.append(f"LOCATION:{escape_text(record['location'])}")
+    caller = str(record.get("caller") or "").strip()
+    if caller:
+        if not caller.lower().startswith("caller"):
+            caller = f"Caller: {caller}"
+        lines.append(f"DESCRIPTION:{escape_text(caller)}")
+    lines.append("END:VEVENT")
+    return lines
+
+
+def render_ics(items, window_start):
+    # items are (uid, record) pairs in the events.json schema; returns bytes.
+    # DTSTAMP is the first day of the window the file was generated for: it
+    # never lies in the future, and the same schedule over the same window
+    # gives an identical file.
+    stamp = f"{window_start:%Y%m%d}T000000Z"
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        f"PRODID:{PRODID}",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        f"X-WR-CALNAME:{escape_text(CALENDAR_NAME)}",
+        "X-WR-TIMEZONE:Europe/Berlin",
+        f"REFRESH-INTERVAL;VALUE=DURATION:{REFRESH_INTERVAL}",
+        f"X-PUBLISHED-TTL:{REFRESH_INTERVAL}",
+    ]
+    for uid, record in sorted(items, key=lambda item: (record_sort_key(item[1]), str(item[0]))):
+        lines.extend(event_lines(uid, record, stamp))
+    lines.append("END:VCALENDAR")
+    return ("\r\n".join(fold(line) for line in lines) + "\r\n").encode("utf-8")
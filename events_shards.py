@@ -0,0 +1,83 @@
+import hashlib
+import json
+import re
+import sys
+from datetime import datetime
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+from events import canonical_record, load_records, record_sort_key
+from fileio import indexed_names, write_if_changed
+from precompress import precompress
+
+
+# Per-month slices of events.json for the schedule page. Shards are named by
+# content hash (events/2026-10.<hash>.json) and can be cached for good; only
+# the small events/index.json has to be fetched fresh.
+LOCAL_TZ = ZoneInfo("Europe/Berlin")
+INDEX_NAME = "index.json"
+HASH_LENGTH = 10
+SHARD_PATTERN = re.compile(r"^\d{4}-\d{2}\.[0-9a-f]{10}\.json$")
+
+
+def month_key(record):
+    # Months follow the Berlin calendar the page is shown in.
+    try:
+        start = datetime.fromisoformat(f"{record['date']}T{record['time']}+00:00")
+    except (TypeError, ValueError):
+        return str(record.get("date") or "")[:7]
+    return start.astimezone(LOCAL_TZ).strftime("%Y-%m")
+
+
+def group_by_month(records):
+    months = {}
+    for record in sorted((canonical_record(record) for record in records), key=record_sort_key):
+        months.setdefault(month_key(record), []).append(record)
+    return months
+
+
+def write_file(path, data):
+    if not write_if_changed(path, data):
+        return False
+    precompress(path)
+    return True
+
+
+def indexed_files(index_path):
+    return indexed_names(index_path, lambda index: (entry["file"] for entry in index["months"]))
+
+
+def write_shards(records, out_dir):
+    # Shards first, then the index (see fileio.indexed_names). Returns the
+    # number of files written.
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    previous = indexed_files(out_dir / INDEX_NAME)
+    written = 0
+    months = []
+    for month, items in sorted(group_by_month(records).items()):
+        data = json.dumps(items, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        name = f"{month}.{hashlib.sha256(data).hexdigest()[:HASH_LENGTH]}.json"
+        written += write_file(out_dir / name, data)
+        months.append({"month": month, "file": name, "count": len(items)})
+
+    index = json.dumps({"months": months}, ensure_ascii=False, indent=2) + "\n"
+    written += write_file(out_dir / INDEX_NAME, index.encode("utf-8"))
+
+    current = {entry["file"] for entry in months} | previous
+    for path in out_dir.iterdir():
+        base = path.name.removesuffix(".gz").removesuffix(".br")
+        if SHARD_PATTERN.match(base) and base not in current:
+            path.unlink()
+    return written
+
+
+def main(argv):
+    if len(argv) != 3:
+        raise SystemExit("Usage: events_shards.py events.json OUT_DIR")
+    written = write_shards(load_records(argv[1]), argv[2])
+    print(f"INFO: Wrote {written} event shard files to {argv[2]}.")
+
+
+if __name__ == "__main__":
+    main(sys.argv)
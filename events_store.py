@@ -0,0 +1,217 @@
+import argparse
+import datetime
+import hashlib
+import json
+import sqlite3
+import sys
+from pathlib import Path
+
+
+# Persistent history of calendar occurrences, keyed by event UID and UTC
+# start. Each refresh upserts only occurrences whose content changed and marks
+# the ones that vanished from the refreshed window; any window can then be
+# exported without touching the feeds.
+DEFAULT_STORE = Path(__file__).resolve().parent / ".cache" / "events" / "events.sqlite"
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    at TEXT NOT NULL,
+    window_start TEXT NOT NULL,
+    window_end TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS occurrences (
+    uid TEXT NOT NULL,
+    start_at TEXT NOT NULL,
+    end_at TEXT NOT NULL,
+    details TEXT,
+    location TEXT,
+    caller TEXT,
+    digest TEXT NOT NULL,
+    added_run INTEGER NOT NULL,
+    changed_run INTEGER NOT NULL,
+    removed_run INTEGER,
+    PRIMARY KEY (uid, start_at)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS occurrences_by_start ON occurrences (start_at);
+CREATE INDEX IF NOT EXISTS occurrences_by_changed ON occurrences (changed_run);
+"""
+
+
+def utc_key(value):
+    # Sortable UTC text; naive datetimes are taken as local time.
+    return value.astimezone(datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M")
+
+
+def record_key(record):
+    return f"{record['date']}T{record['time']}"
+
+
+def record_digest(record):
+    payload = json.dumps(
+        [record.get(field) for field in ("end_date", "end_time", "details", "location", "caller")],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def row_record(row):
+    start_at, end_at, details, location, caller = row
+    return {
+        "date": start_at[:10],
+        "time": start_at[11:16],
+        "end_date": end_at[:10],
+        "end_time": end_at[11:16],
+        "details": details,
+        "location": location,
+        "caller": caller,
+    }
+
+
+class EventStore:
+    def __init__(self, path=DEFAULT_STORE):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def sync(self, window_start, window_end, items):
+        # items are (uid, record) pairs in the events.json schema covering
+        # window_start..window_end; returns the run id and its change counts.
+        low, high = utc_key(window_start), utc_key(window_end)
+        counts = {"added": 0, "changed": 0, "removed": 0}
+        with self.connection:
+            run = self.connection.execute(
+                "INSERT INTO runs (at, window_start, window_end) VALUES (?, ?, ?)",
+                (datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"), low, high),
+            ).lastrowid
+            seen = set()
+            for uid, record in items:
+                key = (uid, record_key(record))
+                if key in seen:
+                    continue
+                seen.add(key)
+                digest = record_digest(record)
+                existing = self.connection.execute(
+                    "SELECT digest, removed_run FROM occurrences WHERE uid = ? AND start_at = ?", key
+                ).fetchone()
+                if existing == (digest, None):
+                    continue
+                counts["added" if existing is None or existing[1] is not None else "changed"] += 1
+                self.connection.execute(
+                    """
+                    INSERT INTO occurrences
+                        (uid, start_at, end_at, details, location, caller, digest, added_run, changed_run)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (uid, start_at) DO UPDATE SET
+                        end_at = excluded.end_at,
+                        details = excluded.details,
+                        location = excluded.location,
+                        caller = excluded.caller,
+                        digest = excluded.digest,
+                        added_run = CASE WHEN removed_run IS NULL
+                            THEN added_run ELSE excluded.added_run END,
+                        changed_run = excluded.changed_run,
+                        removed_run = NULL
+                    """,
+                    (
+                        *key,
+                        f"{record['end_date']}T{record['end_time']}",
+                        record.get("details"),
+                        record.get("location"),
+                        record.get("caller"),
+                        digest,
+                        run,
+                        run,
+                    ),
+                )
+            stale = [
+                row
+                for row in self.connection.execute(
+                    "SELECT uid, start_at FROM occurrences "
+                    "WHERE start_at >= ? AND start_at < ? AND removed_run IS NULL",
+                    (low, high),
+                )
+                if row not in seen
+            ]
+            self.connection.executemany(
+                "UPDATE occurrences SET removed_run = ?, changed_run = ? WHERE uid = ? AND start_at = ?",
+                [(run, run, *row) for row in stale],
+            )
+            counts["removed"] = len(stale)
+        return run, counts
+
+    def export(self, window_start, window_end):
+        rows = self.connection.execute(
+            "SELECT start_at, end_at, details, location, caller FROM occurrences "
+            "WHERE start_at >= ? AND start_at < ? AND removed_run IS NULL "
+            "ORDER BY start_at, end_at, details, location, caller",
+            (utc_key(window_start), utc_key(window_end)),
+        )
+        return [row_record(row) for row in rows]
+
+    def last_run(self):
+        row = self.connection.execute("SELECT MAX(id) FROM runs").fetchone()
+        return row[0]
+
+    def changes(self, since_run):
+        # Occurrences added, changed or removed in runs after since_run.
+        diff = {"added": [], "removed": [], "changed": []}
+        rows = self.connection.execute(
+            "SELECT start_at, end_at, details, location, caller, added_run, removed_run "
+            "FROM occurrences WHERE changed_run > ? ORDER BY start_at",
+            (since_run,),
+        )
+        for *values, added_run, removed_run in rows:
+            if removed_run is not None:
+                kind = "removed"
+            elif added_run > since_run:
+                kind = "added"
+            else:
+                kind = "changed"
+            diff[kind].append(row_record(values))
+        return diff
+
+
+def parse_date(value):
+    return datetime.datetime.combine(datetime.date.fromisoformat(value), datetime.time())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query the persistent events store.")
+    parser.add_argument("--store", default=DEFAULT_STORE, help="SQLite file written by events.py --store")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export = commands.add_parser("export", help="Write the events of a window in the events.json schema")
+    export.add_argument("--start", type=parse_date, required=True)
+    export.add_argument("--end", type=parse_date, required=True)
+    export.add_argument("--output", help="Output file (default: stdout)")
+    changes = commands.add_parser("changes", help="Events added, changed or removed since a run")
+    changes.add_argument("--since", type=int, help="Run id (default: the run before the last one)")
+    args = parser.parse_args(argv)
+
+    if not Path(args.store).exists():
+        raise SystemExit(f"Store not found: {args.store}")
+    with EventStore(args.store) as store:
+        if args.command == "export":
+            result = store.export(args.start, args.end)
+        else:
+            since = args.since if args.since is not None else (store.last_run() or 1) - 1
+            result = store.changes(since)
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.command == "export" and args.output:
+        Path(args.output).write_text(text, encoding="utf-8")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+import contextlib
+import hashlib
+import json
+import os
+from pathlib import Path
+
+
+# File helpers shared by the build and update scripts. Outputs are written to
+# a temporary sibling (.name.tmp) and swapped in with os.replace, so nginx,
+# rsync or a parallel run only ever see complete files.
+
+
+@contextlib.contextmanager
+def replacing(path):
+    # Yields the temporary path to write; it replaces path when the block
+    # succeeds and is removed when it fails.
+    path = Path(path)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    tmp_path.unlink(missing_ok=True)
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+def write_atomic(path, data, mtime_ns=None):
+    # data is bytes; with mtime_ns the file carries that modification time.
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with replacing(path) as tmp_path:
+        tmp_path.write_bytes(data)
+        if mtime_ns is not None:
+            os.utime(tmp_path, ns=(mtime_ns, mtime_ns))
+
+
+def write_if_changed(path, data):
+    # Left untouched when nothing changed, so rsync and caches see no update.
+    # Returns whether the file was written.
+    path = Path(path)
+    try:
+        if path.read_bytes() == data:
+            return False
+    except FileNotFoundError:
+        pass
+    write_atomic(path, data)
+    return True
+
+
+def load_json_object(path):
+    # {} when the file is missing, unreadable or not a JSON object.
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def write_json(path, data):
+    write_atomic(path, (json.dumps(data, indent=2, sort_keys=True) + "\n").encode("utf-8"))
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def file_record(path, previous=None):
+    # Reuse the stored digest while size and mtime are unchanged, so an
+    # unchanged input only has to be stat'ed instead of read.
+    stat = Path(path).stat()
+    if (
+        previous
+        and previous.get("size") == stat.st_size
+        and previous.get("mtime_ns") == stat.st_mtime_ns
+    ):
+        return previous
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": file_sha256(path)}
+
+
+def indexed_names(index_path, list_names):
+    # Names of the content-hashed files an index (gallery.json,
+    # events/index.json) refers to; list_names maps the parsed index to them.
+    # Writers put the hashed files first and the index last, and keep the
+    # files of the previous index for one more run, so a visitor who just
+    # read the old index still finds them.
+    try:
+        with open(index_path, "r", encoding="utf-8") as f:
+            return set(list_names(json.load(f)))
+    except (OSError, ValueError, AttributeError, KeyError, TypeError):
+        return set()
@@ -3,12 +3,14 @@ import json
 import re
 import sys
 from datetime import datetime, timezone
+from functools import lru_cache
 from urllib.parse import quote_plus
 from zoneinfo import ZoneInfo
 
+from build_pages import mark_active
+
 
 LOCAL_TZ = ZoneInfo("Europe/Berlin")
-ACTIVE_CLASS = "active"
 MONTHS_DE = [
     "Jan.",
     "Feb.",
@@ -23,6 +25,8 @@ MONTHS_DE = [
     "Nov.",
     "Dez.",
 ]
+ORGANIZER = "Ohmoor Squeezers e.V."
+SITE_URL = "https://ohmoor-squeezers.de/"
 
 
 def parse_dt(date_str, time_str):
@@ -33,59 +37,173 @@ def parse_dt(date_str, time_str):
     return utc_dt.astimezone(LOCAL_TZ)
 
 
+@lru_cache(maxsize=None)
+def local_offset(date_str, hour):
+    # Berlin's UTC offset only changes on the hour, so one zone lookup per
+    # date and hour covers every event starting or ending in it.
+    utc_dt = datetime(int(date_str[0:4]), int(date_str[5:7]), int(date_str[8:10]), hour, tzinfo=timezone.utc)
+    return utc_dt.astimezone(LOCAL_TZ).utcoffset()
+
+
+def local_dt(date_str, time_str):
+    # Naive local time; same result as parse_dt without strptime per call.
+    if len(date_str) != 10 or len(time_str) != 5 or time_str[2] != ":":
+        return parse_dt(date_str, time_str).replace(tzinfo=None)
+    hour = int(time_str[0:2])
+    utc_dt = datetime(
+        int(date_str[0:4]), int(date_str[5:7]), int(date_str[8:10]), hour, int(time_str[3:5])
+    )
+    return utc_dt + local_offset(date_str, hour)
+
+
+@lru_cache(maxsize=None)
+def format_day_de(day):
+    return f"{day.day}. {MONTHS_DE[day.month - 1]} {day.year}"
+
+
 def format_date_de(dt):
-    return f"{dt.day}. {MONTHS_DE[dt.month - 1]} {dt.year}"
+    return format_day_de(dt.date())
 
 
-def mark_active(nav_html, page_name):
-    pattern = re.compile(rf"<a([^>]*?)href=[\"']{re.escape(page_name)}[\"']([^>]*)>")
+def format_time(dt):
+    return f"{dt.hour:02d}:{dt.minute:02d}"
 
-    def repl(match):
-        attrs_before = match.group(1)
-        attrs_after = match.group(2)
-        full_attrs = f"{attrs_before}{attrs_after}"
-        if "data-skip-active" in full_attrs:
-            return match.group(0)
-        if "class=" in full_attrs:
-            return re.sub(
-                r"class=[\"']([^\"']*)[\"']",
-                lambda m: f'class="{m.group(1)} {ACTIVE_CLASS}"',
-                match.group(0),
-                count=1,
-            )
-        return f"<a{attrs_before}href=\"{page_name}\" class=\"{ACTIVE_CLASS}\"{attrs_after}>"
 
-    return pattern.sub(repl, nav_html)
+# Badges for event details, in priority order. Each rule is found by one
+# case-insensitive pattern (no capture groups, valid in Python and JS); its
+# matches are cut from the text, then `blank` matches become spaces, `trim`
+# matches are dropped and whitespace is collapsed; event_status is the
+# schema.org status in the JSON-LD. The same table drives the
+# client renderer in schedule.html (see rules_json), so adding a badge is a
+# new row here, not another scan.
+DETAIL_RULES = [
+    {
+        "kind": "cancelled",
+        "pattern": r"abgesagt",
+        "badge": "Abgesagt",
+        "badge_class": "cancelled",
+        "row_class": "is-cancelled",
+        "show_time": True,
+        "blank": r"[-–—]",
+        "trim": "",
+        "fallback": "Clubabend",
+        "event_status": "EventCancelled",
+    },
+    {
+        "kind": "no-dance",
+        "pattern": r"kein\s+tanzen",
+        "badge": "Kein Tanzen",
+        "badge_class": "no-dance",
+        "row_class": "is-no-dance",
+        "show_time": False,
+        "blank": "",
+        "trim": r"^[\s\-–—:]+",
+        "fallback": "",
+        "event_status": "EventCancelled",
+    },
+]
 
 
-def load_events(path):
-    with open(path, "r", encoding="utf-8") as f:
-        events = json.load(f)
-    events.sort(key=lambda e: parse_dt(e["date"], e["time"]))
-    return events
+class DetailRule:
+    __slots__ = (
+        "kind",
+        "badge",
+        "badge_class",
+        "row_class",
+        "show_time",
+        "blank",
+        "trim",
+        "fallback",
+        "event_status",
+    )
+
+    def __init__(self, rule):
+        self.kind = rule["kind"]
+        self.badge = rule["badge"]
+        self.badge_class = rule["badge_class"]
+        self.row_class = rule["row_class"]
+        self.show_time = rule["show_time"]
+        self.blank = re.compile(rule["blank"]) if rule["blank"] else None
+        self.trim = re.compile(rule["trim"]) if rule["trim"] else None
+        self.fallback = rule["fallback"]
+        self.event_status = rule["event_status"]
+
+
+def compile_rules(rules):
+    for rule in rules:
+        if re.compile(rule["pattern"]).groups:
+            raise ValueError(f"Detail rule {rule['kind']!r} must not use capture groups")
+    combined = re.compile(
+        "|".join(f"({rule['pattern']})" for rule in rules), re.IGNORECASE
+    )
+    return combined, [DetailRule(rule) for rule in rules]
+
+
+DETAIL_PATTERN, COMPILED_RULES = compile_rules(DETAIL_RULES)
+WHITESPACE_PATTERN = re.compile(r"\s+")
 
 
-def is_cancelled(details):
-    return "abgesagt" in details.lower()
+def classify_details(details):
+    # One scan over details; returns (rule or None, display text).
+    spans = [(match.lastindex - 1, match.start(), match.end()) for match in DETAIL_PATTERN.finditer(details)]
+    if not spans:
+        return None, details
+    index = min(span[0] for span in spans)
+    rule = COMPILED_RULES[index]
+    parts = []
+    position = 0
+    for span_index, start, end in spans:
+        if span_index == index:
+            parts.append(details[position:start])
+            position = end
+    parts.append(details[position:])
+    text = "".join(parts)
+    if rule.blank:
+        text = rule.blank.sub(" ", text)
+    if rule.trim:
+        text = rule.trim.sub("", text)
+    text = WHITESPACE_PATTERN.sub(" ", text).strip()
+    return rule, text or rule.fallback
 
 
-def clean_cancelled_details(details):
-    cleaned = details.replace("abgesagt", "").replace("Abgesagt", "")
-    cleaned = " ".join(cleaned.replace("-", " ").split()).strip()
-    if not cleaned:
-        return "Clubabend"
-    return cleaned
+def rules_json():
+    return json.dumps({"rules": DETAIL_RULES}, ensure_ascii=False)
 
 
-def is_no_dance(details):
-    return bool(re.search(r"kein\s+tanzen", details, flags=re.IGNORECASE))
+def render_rules_script():
+    # Embedded in schedule.html for the client renderer; "<" is escaped so
+    # the JSON cannot close the script element.
+    data = rules_json().replace("<", "\\u003c")
+    return f'<script type="application/json" id="schedule-rules">{data}</script>'
 
 
-def clean_no_dance_reason(details):
-    cleaned = re.sub(r"kein\s+tanzen", "", details, flags=re.IGNORECASE)
-    cleaned = re.sub(r"^[\s\-–—:]+", "", cleaned)
-    cleaned = " ".join(cleaned.split()).strip()
-    return cleaned
+class ScheduleEvent:
+    # One events.json entry, parsed and classified once for sorting and rendering.
+    __slots__ = ("sort_key", "start", "end", "details", "location", "caller", "rule", "text")
+
+    def __init__(self, record):
+        date_str, time_str = record.get("date", ""), record.get("time", "")
+        # UTC date and time strings sort chronologically, like the UTC instant.
+        self.sort_key = (date_str, time_str)
+        self.start = local_dt(date_str, time_str)
+        self.end = local_dt(record.get("end_date", ""), record.get("end_time", ""))
+        # Feeds leave SUMMARY/DESCRIPTION out at times; null renders empty,
+        # as in the client renderer.
+        self.details = record.get("details") or ""
+        self.location = record.get("location") or ""
+        self.caller = record.get("caller") or ""
+        self.rule, self.text = classify_details(self.details)
+
+
+def schedule_events(records):
+    events = [r if isinstance(r, ScheduleEvent) else ScheduleEvent(r) for r in records]
+    events.sort(key=lambda e: e.sort_key)
+    return events
+
+
+def load_events(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return schedule_events(json.load(f))
 
 
 def render_location(raw_location):
@@ -104,39 +222,62 @@ def render_location(raw_location):
     )
 
 
-def render(events, nav_html):
-    title = "Ohmoor Squeezers e.V. - Clubabende"
+def event_jsonld(e):
+    # schema.org Event for search engines; times carry the Berlin offset.
+    rule = e.rule
+    item = {
+        "@context": "https://schema.org",
+        "@type": "Event",
+        "name": (e.text if rule else e.details) or (rule.badge if rule else "Clubabend"),
+        "startDate": e.start.replace(tzinfo=LOCAL_TZ).isoformat(timespec="minutes"),
+        "endDate": e.end.replace(tzinfo=LOCAL_TZ).isoformat(timespec="minutes"),
+        "eventStatus": f"https://schema.org/{rule.event_status if rule else 'EventScheduled'}",
+        "eventAttendanceMode": "https://schema.org/OfflineEventAttendanceMode",
+        "organizer": {"@type": "Organization", "name": ORGANIZER, "url": SITE_URL},
+    }
+    parts = [p.strip() for p in e.location.split(",") if p.strip()]
+    if parts:
+        item["location"] = {"@type": "Place", "name": parts[0], "address": ", ".join(parts)}
+    if e.caller:
+        item["performer"] = {"@type": "Person", "name": e.caller}
+    return item
+
+
+def render_jsonld(items):
+    if not items:
+        return ""
+    data = json.dumps(items, ensure_ascii=False, separators=(",", ":")).replace("<", "\\u003c")
+    return f'<script type="application/ld+json">{data}</script>'
+
+
+def render_table(events, structured=None):
+    # With a structured list, the schema.org Event of each row is appended to
+    # it in the same pass (see render_jsonld). data-month is the Berlin month
+    # of the row, which names its events/ shard (events_shards.month_key).
     rows = []
+    # Club nights share a handful of venues; render each one once.
+    locations = {}
     for e in events:
-        start_local = parse_dt(e.get("date", ""), e.get("time", ""))
-        end_local = parse_dt(e.get("end_date", ""), e.get("end_time", ""))
-        date = html.escape(format_date_de(start_local))
-        time = html.escape(start_local.strftime("%H:%M"))
-        end_time = html.escape(end_local.strftime("%H:%M"))
-        raw_details = e.get("details", "")
-        cancelled = is_cancelled(raw_details)
-        no_dance = (not cancelled) and is_no_dance(raw_details)
-        if cancelled:
-            details = (
-                f"<span class=\"badge cancelled\">Abgesagt</span> "
-                f"{html.escape(clean_cancelled_details(raw_details))}"
-            )
-        elif no_dance:
-            reason = clean_no_dance_reason(raw_details)
-            reason_text = f" {html.escape(reason)}" if reason else ""
-            details = f"<span class=\"badge no-dance\">Kein Tanzen</span>{reason_text}"
+        if not isinstance(e, ScheduleEvent):
+            e = ScheduleEvent(e)
+        date = html.escape(format_date_de(e.start))
+        rule = e.rule
+        if rule:
+            text = f" {html.escape(e.text)}" if e.text else ""
+            details = f"<span class=\"badge {rule.badge_class}\">{html.escape(rule.badge)}</span>{text}"
         else:
-            details = html.escape(raw_details)
-        location = render_location(e.get("location", "") or "")
-        caller = html.escape(e.get("caller", ""))
-        date_line = date if no_dance else f"{date} | {time}-{end_time}"
-        row_class = (
-            " class=\"is-cancelled\""
-            if cancelled
-            else (" class=\"is-no-dance\"" if no_dance else "")
-        )
+            details = html.escape(e.details)
+        location = locations.get(e.location)
+        if location is None:
+            location = locations[e.location] = render_location(e.location)
+        caller = html.escape(e.caller)
+        show_time = rule.show_time if rule else True
+        date_line = f"{date} | {format_time(e.start)}-{format_time(e.end)}" if show_time else date
+        row_class = f" class=\"{rule.row_class}\"" if rule else ""
+        if structured is not None:
+            structured.append(event_jsonld(e))
         rows.append(
-            f"        <tr{row_class}>\n"
+            f"        <tr{row_class} data-month=\"{e.start:%Y-%m}\">\n"
             f"          <td data-label=\"Datum & Zeit\">{html.escape(date_line)}</td>\n"
             f"          <td data-label=\"Details\">{details}</td>\n"
             f"          <td data-label=\"Ort\">{location}</td>\n"
@@ -145,7 +286,7 @@ def render(events, nav_html):
         )
 
     if rows:
-        body = (
+        return (
             "      <table>\n"
             "        <thead>\n"
             "          <tr>\n"
@@ -160,9 +301,12 @@ def render(events, nav_html):
             + "\n        </tbody>\n"
             "      </table>\n"
         )
-    else:
-        body = "      <p>Keine Termine vorhanden.</p>\n"
+    return "      <p>Keine Termine vorhanden.</p>\n"
+
 
+def render(events, nav_html):
+    title = "Ohmoor Squeezers e.V. - Clubabende"
+    body = render_table(events)
     return (
         "<!doctype html>\n"
         "<html lang=\"de\">\n"
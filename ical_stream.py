@@ -0,0 +1,351 @@
+import re
+import sys
+from datetime import date, datetime, timedelta, timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from dateutil.rrule import rrulestr
+
+
+# Streaming alternative to icalevents for large feeds: the .ics is read line by
+# line, VEVENTs that cannot touch the window are dropped before any Event is
+# built, and RRULEs are only expanded between the window bounds. Results follow
+# icalevents' non-strict semantics (window in the event's zone, day-based
+# EXDATEs, floating and all-day events in the calendar zone).
+UTC = timezone.utc
+EVENT_PROPERTIES = {
+    "UID",
+    "DTSTART",
+    "DTEND",
+    "DURATION",
+    "RRULE",
+    "EXDATE",
+    "RECURRENCE-ID",
+    "SUMMARY",
+    "LOCATION",
+    "DESCRIPTION",
+}
+TEXT_ESCAPE_PATTERN = re.compile(r"\\([\\,;nN])")
+DURATION_PATTERN = re.compile(
+    r"^([+-])?P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$"
+)
+UNTIL_PATTERN = re.compile(r"UNTIL=([0-9TZ]+)", re.IGNORECASE)
+
+
+class Event:
+    __slots__ = ("uid", "start", "end", "summary", "location", "description", "recurrence_id")
+
+    def __init__(self, uid, start, end, summary, location, description, recurrence_id=None):
+        self.uid = uid
+        self.start = start
+        self.end = end
+        self.summary = summary
+        self.location = location
+        self.description = description
+        self.recurrence_id = recurrence_id
+
+
+def unfold(lines):
+    # RFC 5545 folding: a line starting with a space or tab continues the
+    # previous one.
+    current = None
+    for raw in lines:
+        line = raw.rstrip("\r\n")
+        if line[:1] in (" ", "\t"):
+            if current is not None:
+                current += line[1:]
+            continue
+        if current:
+            yield current
+        current = line
+    if current:
+        yield current
+
+
+def property_name(line):
+    end = len(line)
+    for separator in (";", ":"):
+        index = line.find(separator)
+        if index != -1 and index < end:
+            end = index
+    return line[:end].upper()
+
+
+def split_property(line):
+    in_quotes = False
+    for index, char in enumerate(line):
+        if char == '"':
+            in_quotes = not in_quotes
+        elif char == ":" and not in_quotes:
+            head, value = line[:index], line[index + 1:]
+            break
+    else:
+        return line.upper(), {}, ""
+    name, *raw_params = head.split(";")
+    params = {}
+    for param in raw_params:
+        key, _, param_value = param.partition("=")
+        params[key.upper()] = param_value.strip('"')
+    return name.upper(), params, value
+
+
+def unescape_text(value):
+    return TEXT_ESCAPE_PATTERN.sub(lambda m: "\n" if m.group(1) in "nN" else m.group(1), value)
+
+
+@lru_cache(maxsize=None)
+def zone(tzid):
+    try:
+        return ZoneInfo(tzid)
+    except (ZoneInfoNotFoundError, ValueError):
+        return None
+
+
+def parse_datetime(value, params):
+    value = value.strip()
+    if params.get("VALUE") == "DATE" or len(value) == 8:
+        return date(int(value[0:4]), int(value[4:6]), int(value[6:8]))
+    parsed = datetime(
+        int(value[0:4]),
+        int(value[4:6]),
+        int(value[6:8]),
+        int(value[9:11]),
+        int(value[11:13]),
+        int(value[13:15]),
+    )
+    if value.endswith("Z"):
+        return parsed.replace(tzinfo=UTC)
+    tzinfo = zone(params["TZID"]) if "TZID" in params else None
+    return parsed.replace(tzinfo=tzinfo) if tzinfo else parsed
+
+
+def parse_duration(value):
+    match = DURATION_PATTERN.match(value.strip())
+    if not match:
+        return timedelta()
+    sign, weeks, days, hours, minutes, seconds = match.groups()
+    duration = timedelta(
+        weeks=int(weeks or 0),
+        days=int(days or 0),
+        hours=int(hours or 0),
+        minutes=int(minutes or 0),
+        seconds=int(seconds or 0),
+    )
+    return -duration if sign == "-" else duration
+
+
+def window_for(value, start, end):
+    # Window bounds of the same flavour as `value`; naive bounds are read as
+    # wall-clock time in the event's zone, like icalevents does.
+    if type(value) is date:
+        return start.date(), end.date()
+    if value.tzinfo is None:
+        return start.replace(tzinfo=None), end.replace(tzinfo=None)
+    if start.tzinfo is None:
+        return start.replace(tzinfo=value.tzinfo), end.replace(tzinfo=value.tzinfo)
+    return start.astimezone(value.tzinfo), end.astimezone(value.tzinfo)
+
+
+def as_datetime(value):
+    return value if type(value) is datetime else datetime(value.year, value.month, value.day)
+
+
+def rule_until(rules, dtstart):
+    # Latest UNTIL over all rules, or None when any rule is open-ended.
+    latest = None
+    for rule in rules:
+        match = UNTIL_PATTERN.search(rule)
+        if not match:
+            return None
+        until = parse_datetime(match.group(1), {})
+        if type(until) is date:
+            until = datetime(until.year, until.month, until.day, 23, 59, 59)
+        if dtstart.tzinfo is None:
+            until = until.astimezone(UTC).replace(tzinfo=None) if until.tzinfo else until
+        elif until.tzinfo is None:
+            until = until.replace(tzinfo=dtstart.tzinfo)
+        latest = until if latest is None or until > latest else latest
+    return latest
+
+
+def conform_rule(rule, dtstart):
+    # dateutil wants UNTIL in UTC for zoned DTSTART and floating otherwise.
+    def replace(match):
+        until = parse_datetime(match.group(1), {})
+        if type(until) is date:
+            until = datetime(until.year, until.month, until.day, 23, 59, 59)
+        if dtstart.tzinfo is None:
+            if until.tzinfo:
+                until = until.astimezone(UTC).replace(tzinfo=None)
+            return "UNTIL=" + until.strftime("%Y%m%dT%H%M%S")
+        if until.tzinfo is None:
+            until = until.replace(tzinfo=dtstart.tzinfo)
+        return "UNTIL=" + until.astimezone(UTC).strftime("%Y%m%dT%H%M%SZ")
+
+    return UNTIL_PATTERN.sub(replace, rule)
+
+
+def exception_days(lines):
+    days = set()
+    for line in lines:
+        _, _, value = split_property(line)
+        days.update(item.strip()[:8] for item in value.split(",") if item.strip())
+    return days
+
+
+def first_value(props, name):
+    lines = props.get(name)
+    if not lines:
+        return None
+    return split_property(lines[0])
+
+
+def occurrences(props, start, end):
+    # Yields (start, end) pairs of one VEVENT inside the window, or nothing.
+    dtstart_prop = first_value(props, "DTSTART")
+    if dtstart_prop is None:
+        return
+    dtstart = parse_datetime(dtstart_prop[2], dtstart_prop[1])
+    dtend_prop = first_value(props, "DTEND")
+    duration_prop = first_value(props, "DURATION")
+    if dtend_prop is not None:
+        dtend = parse_datetime(dtend_prop[2], dtend_prop[1])
+    elif duration_prop is not None:
+        dtend = dtstart + parse_duration(duration_prop[2])
+    else:
+        dtend = dtstart
+    exceptions = exception_days(props.get("EXDATE", ()))
+
+    rules = [split_property(line)[2] for line in props.get("RRULE", ())]
+    if not rules:
+        low, high = window_for(dtstart, start, end)
+        if dtend >= low and dtstart <= high and dtstart.strftime("%Y%m%d") not in exceptions:
+            yield dtstart, dtend
+        return
+
+    rule_start = as_datetime(dtstart)
+    low, high = window_for(rule_start, start, end)
+    if rule_start > high:
+        return
+    until = rule_until(rules, rule_start)
+    if until is not None and until < low:
+        return
+    span = as_datetime(dtend) - rule_start
+    rule = rrulestr(
+        "\n".join(f"RRULE:{conform_rule(value, rule_start)}" for value in rules),
+        dtstart=rule_start,
+        forceset=True,
+    )
+    for occurrence in rule.between(low, high, inc=True):
+        if occurrence.strftime("%Y%m%d") in exceptions:
+            continue
+        if type(dtstart) is date:
+            yield occurrence.date(), (occurrence + span).date()
+        else:
+            yield occurrence, occurrence + span
+
+
+def build_events(props, start, end):
+    spans = list(occurrences(props, start, end))
+    recurrence_id = None
+    rid_prop = first_value(props, "RECURRENCE-ID")
+    if rid_prop is not None:
+        recurrence_id = parse_datetime(rid_prop[2], rid_prop[1])
+    if not spans:
+        return [], recurrence_id
+
+    def text(name):
+        prop = first_value(props, name)
+        return None if prop is None else unescape_text(prop[2])
+
+    uid_prop = first_value(props, "UID")
+    uid = uid_prop[2] if uid_prop else None
+    summary, location, description = text("SUMMARY"), text("LOCATION"), text("DESCRIPTION")
+    return [
+        Event(uid, span_start, span_end, summary, location, description, recurrence_id)
+        for span_start, span_end in spans
+    ], recurrence_id
+
+
+def calendar_zone(timezones):
+    # icalevents' fallback zone: the only zone named in the calendar, else UTC.
+    if len(timezones) == 1:
+        return zone(next(iter(timezones))) or UTC
+    return UTC
+
+
+def normalize(value, cal_tz):
+    if type(value) is date:
+        return datetime(value.year, value.month, value.day, tzinfo=cal_tz)
+    if value.tzinfo is None:
+        return value.replace(tzinfo=cal_tz)
+    return value.astimezone(cal_tz)
+
+
+def parse_events(lines, start, end, sort=True):
+    timezones = set()
+    found = []
+    overrides = set()
+    stack = []
+    props = None
+    for line in unfold(lines):
+        if line[:6].upper() == "BEGIN:":
+            name = line[6:].strip().upper()
+            stack.append(name)
+            if name == "VEVENT":
+                props = {}
+            continue
+        if line[:4].upper() == "END:":
+            name = stack.pop() if stack else ""
+            if name == "VEVENT" and props is not None:
+                events, recurrence_id = build_events(props, start, end)
+                uid_prop = first_value(props, "UID")
+                if recurrence_id is not None and uid_prop is not None:
+                    overrides.add((uid_prop[2], recurrence_id))
+                found.extend(events)
+                props = None
+            continue
+        if not stack:
+            continue
+        current = stack[-1]
+        if current == "VEVENT" and props is not None:
+            name = property_name(line)
+            if name in EVENT_PROPERTIES:
+                props.setdefault(name, []).append(line)
+        elif current == "VTIMEZONE" and property_name(line) == "TZID":
+            timezones.add(split_property(line)[2])
+        elif current == "VCALENDAR" and property_name(line) == "X-WR-TIMEZONE":
+            timezones.add(split_property(line)[2])
+
+    # Occurrences replaced by a RECURRENCE-ID override are dropped even when
+    # the override itself moved out of the window.
+    result = [
+        event
+        for event in found
+        if event.recurrence_id is not None or (event.uid, event.start) not in overrides
+    ]
+    cal_tz = calendar_zone(timezones)
+    for event in result:
+        event.start = normalize(event.start, cal_tz)
+        event.end = normalize(event.end, cal_tz)
+    if sort:
+        result.sort(key=lambda event: event.start)
+    return result
+
+
+def events_from_file(path, start, end, sort=True):
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        return parse_events(f, start, end, sort=sort)
+
+
+def main(argv):
+    if len(argv) != 4:
+        raise SystemExit("Usage: ical_stream.py FILE.ics START END  (ISO dates)")
+    start = datetime.fromisoformat(argv[2])
+    end = datetime.fromisoformat(argv[3])
+    for event in events_from_file(argv[1], start, end):
+        print(f"{event.start.isoformat()}  {event.summary}")
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,660 @@
+import io
+import re
+import struct
+import zlib
+from datetime import datetime
+
+
+# Reads image dimensions, EXIF capture time and orientation from file headers
+# only: the chunk and segment headers for PNG, JPEG and WebP, the metadata box
+# for AVIF and the root element for SVG. Nothing is decoded, so this works
+# without Pillow and costs a few small reads per file.
+#
+# strip_metadata() writes a copy without EXIF, XMP, IPTC and comments (GPS
+# position, camera serial numbers, names), keeping only the orientation so
+# browsers still show the photo upright. Pixel data is copied unchanged.
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+PNG_PRIVATE_CHUNKS = {b"eXIf", b"tEXt", b"zTXt", b"iTXt"}
+# Start-of-frame markers; C4 (DHT), C8 (JPG) and CC (DAC) share the range.
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+# Markers without a length field.
+JPEG_STANDALONE_MARKERS = {0x01, 0xD8} | set(range(0xD0, 0xD8))
+EXIF_HEADER = b"Exif\x00\x00"
+ICC_HEADER = b"ICC_PROFILE\x00"
+WEBP_PRIVATE_CHUNKS = {b"EXIF", b"XMP "}
+WEBP_EXIF_FLAG = 0x08
+WEBP_XMP_FLAG = 0x04
+HEIF_BRANDS = {b"avif", b"avis", b"mif1", b"msf1", b"heic", b"heix"}
+HEIF_XMP_TYPE = b"application/rdf+xml"
+# The AVIF metadata box holds item properties only; anything larger is not
+# worth reading for a header.
+HEIF_META_LIMIT = 1 << 20
+# EXIF orientation for the HEIF irot (counter-clockwise quarter turns) and
+# imir (mirror axis) properties, as libavif maps them.
+HEIF_ORIENTATIONS = {
+    (0, None): 1,
+    (1, None): 8,
+    (2, None): 3,
+    (3, None): 6,
+    (0, 0): 4,
+    (0, 1): 2,
+    (1, 0): 5,
+    (1, 1): 7,
+    (2, 0): 2,
+    (2, 1): 4,
+    (3, 0): 7,
+    (3, 1): 5,
+}
+XMP_EMPTY = (
+    b'<?xpacket begin="" id="W5M0MpCehiHzreSzNTczkc9d"?>'
+    b'<x:xmpmeta xmlns:x="adobe:ns:meta/"/>'
+)
+XMP_END = b'<?xpacket end="w"?>'
+# TIFF tags: Orientation, DateTime and the pointer to the Exif IFD in IFD0;
+# DateTimeOriginal and DateTimeDigitized in the Exif IFD.
+TAG_ORIENTATION = 0x0112
+TAG_DATETIME = 0x0132
+TAG_EXIF_IFD = 0x8769
+TAG_DATETIME_ORIGINAL = 0x9003
+TAG_DATETIME_DIGITIZED = 0x9004
+EXIF_DATETIME_PATTERN = re.compile(r"^(\d{4}):(\d{2}):(\d{2})[ T](\d{2}):(\d{2}):(\d{2})")
+# read_metadata() result for files whose header cannot be parsed.
+UNREADABLE = {"private": True, "unreadable": True}
+SVG_HEAD_BYTES = 64 * 1024
+SVG_TAG_PATTERN = re.compile(r"<svg\b([^>]*)>", re.IGNORECASE | re.DOTALL)
+SVG_ATTRIBUTE_PATTERN = re.compile(r"([\w:-]+)\s*=\s*(\"[^\"]*\"|'[^']*')")
+SVG_LENGTH_PATTERN = re.compile(r"^\s*([0-9]*\.?[0-9]+(?:[eE][+-]?[0-9]+)?)\s*(px)?\s*$")
+
+
+def read_exact(f, size):
+    data = f.read(size)
+    if len(data) != size:
+        raise ValueError("truncated header")
+    return data
+
+
+def exif_fields(tiff):
+    # (orientation, capture time as ISO string or None) from a TIFF structure
+    # as stored in EXIF blocks.
+    if tiff[:4] == b"II*\x00":
+        order = "<"
+    elif tiff[:4] == b"MM\x00*":
+        order = ">"
+    else:
+        return 1, None
+
+    def entries(offset):
+        count = struct.unpack_from(order + "H", tiff, offset)[0]
+        fields = {}
+        for index in range(count):
+            tag, kind, number = struct.unpack_from(order + "HHI", tiff, offset + 2 + index * 12)
+            fields[tag] = (kind, number, offset + 10 + index * 12)
+        return fields
+
+    def value(field):
+        kind, number, offset = field
+        if kind == 3:
+            return struct.unpack_from(order + "H", tiff, offset)[0]
+        if kind == 4:
+            return struct.unpack_from(order + "I", tiff, offset)[0]
+        if kind == 2:
+            if number > 4:
+                offset = struct.unpack_from(order + "I", tiff, offset)[0]
+            return tiff[offset : offset + number].split(b"\x00", 1)[0].decode("ascii", "replace")
+        return None
+
+    ifd0 = entries(struct.unpack_from(order + "I", tiff, 4)[0])
+    orientation = value(ifd0[TAG_ORIENTATION]) if TAG_ORIENTATION in ifd0 else 1
+    stamps = []
+    if TAG_EXIF_IFD in ifd0:
+        exif_ifd = entries(value(ifd0[TAG_EXIF_IFD]))
+        stamps += [exif_ifd[tag] for tag in (TAG_DATETIME_ORIGINAL, TAG_DATETIME_DIGITIZED) if tag in exif_ifd]
+    if TAG_DATETIME in ifd0:
+        stamps.append(ifd0[TAG_DATETIME])
+    taken = None
+    for field in stamps:
+        match = EXIF_DATETIME_PATTERN.match(value(field) or "")
+        try:
+            taken = datetime(*map(int, match.groups())).isoformat() if match else None
+        except ValueError:
+            taken = None
+        if taken:
+            break
+    return (orientation if orientation in range(1, 9) else 1), taken
+
+
+def orientation_tiff(orientation):
+    # The smallest EXIF block: IFD0 with the orientation tag only.
+    entries = [(TAG_ORIENTATION, 3, 1, orientation << 16)] if orientation != 1 else []
+    data = b"MM\x00*" + struct.pack(">IH", 8, len(entries))
+    data += b"".join(struct.pack(">HHII", *entry) for entry in entries)
+    return data + struct.pack(">I", 0)
+
+
+def jpeg_segments(f):
+    # Yields (marker, payload offset, payload length) for each segment up to
+    # the start of scan; f is positioned at the payload when a segment is
+    # yielded and may be read by the caller.
+    if read_exact(f, 2) != b"\xff\xd8":
+        raise ValueError("not a JPEG file")
+    while True:
+        byte = f.read(1)
+        while byte and byte != b"\xff":
+            byte = f.read(1)
+        while byte == b"\xff":
+            byte = f.read(1)
+        if not byte:
+            return
+        marker = byte[0]
+        if marker in JPEG_STANDALONE_MARKERS:
+            continue
+        if marker in (0xD9, 0xDA):
+            return
+        length = struct.unpack(">H", read_exact(f, 2))[0]
+        if length < 2:
+            raise ValueError("invalid JPEG segment")
+        offset = f.tell()
+        yield marker, offset, length - 2
+        f.seek(offset + length - 2)
+
+
+def jpeg_keeps(marker, payload):
+    # JFIF, ICC profiles and the Adobe colour transform are needed to show
+    # the image; other application segments and comments are metadata.
+    if marker == 0xFE:
+        return False
+    if 0xE0 <= marker <= 0xEF:
+        return marker in (0xE0, 0xEE) or (marker == 0xE2 and payload.startswith(ICC_HEADER))
+    return True
+
+
+def jpeg_header(f):
+    header = {"size": None, "exif": None, "private": False}
+    for marker, _, length in jpeg_segments(f):
+        if marker in JPEG_SOF_MARKERS and length >= 5:
+            _, height, width = struct.unpack(">BHH", read_exact(f, 5))
+            header["size"] = (width, height)
+            continue
+        if not 0xE0 <= marker <= 0xFE:
+            continue
+        head = f.read(min(length, len(ICC_HEADER)))
+        if not jpeg_keeps(marker, head):
+            header["private"] = True
+        if marker == 0xE1 and head.startswith(EXIF_HEADER) and header["exif"] is None:
+            header["exif"] = head[len(EXIF_HEADER) :] + read_exact(f, length - len(head))
+    return header
+
+
+def strip_jpeg(data, orientation):
+    out = [data[:2]]
+    if orientation != 1:
+        exif = EXIF_HEADER + orientation_tiff(orientation)
+        app1 = b"\xff\xe1" + struct.pack(">H", len(exif) + 2) + exif
+    else:
+        app1 = b""
+    position = 2
+    while position < len(data):
+        if data[position] != 0xFF:
+            raise ValueError("invalid JPEG marker")
+        while position + 1 < len(data) and data[position + 1] == 0xFF:
+            position += 1
+        marker = data[position + 1]
+        if marker == 0xD9:
+            # Anything after the end of image (e.g. MPF previews with their
+            # own EXIF) is dropped.
+            out.append(b"\xff\xd9")
+            break
+        if marker in JPEG_STANDALONE_MARKERS:
+            out.append(data[position : position + 2])
+            position += 2
+            continue
+        length = struct.unpack_from(">H", data, position + 2)[0]
+        end = position + 2 + length
+        if end > len(data):
+            raise ValueError("truncated JPEG segment")
+        if app1 and not 0xE0 <= marker <= 0xEF:
+            out.append(app1)
+            app1 = b""
+        if jpeg_keeps(marker, data[position + 4 : end]):
+            out.append(data[position:end])
+        position = end
+        if marker == 0xDA:
+            # Entropy-coded data runs to the next marker that is neither a
+            # stuffed 0xFF00 nor a restart marker.
+            while True:
+                end = data.find(b"\xff", end)
+                if end < 0 or end + 1 >= len(data):
+                    end = len(data)
+                    break
+                if data[end + 1] == 0 or 0xD0 <= data[end + 1] <= 0xD7:
+                    end += 2
+                    continue
+                break
+            out.append(data[position:end])
+            position = end
+    return b"".join(out)
+
+
+def png_chunks(data_or_file, start=8):
+    # Yields (type, data offset, data length) for each chunk.
+    if isinstance(data_or_file, (bytes, bytearray)):
+        offset = start
+        while offset + 8 <= len(data_or_file):
+            length, kind = struct.unpack_from(">I4s", data_or_file, offset)
+            yield kind, offset + 8, length
+            offset += 12 + length
+        return
+    f = data_or_file
+    f.seek(start)
+    while True:
+        header = f.read(8)
+        if len(header) < 8:
+            return
+        length, kind = struct.unpack(">I4s", header)
+        offset = f.tell()
+        yield kind, offset, length
+        f.seek(offset + length + 4)
+
+
+def png_header(f):
+    header = {"size": None, "exif": None, "private": False}
+    for kind, _, length in png_chunks(f):
+        if kind == b"IHDR":
+            header["size"] = struct.unpack(">II", read_exact(f, 8))
+        elif kind in PNG_PRIVATE_CHUNKS:
+            header["private"] = True
+            if kind == b"eXIf":
+                header["exif"] = read_exact(f, length)
+        elif kind == b"IEND":
+            break
+    return header
+
+
+def png_chunk(kind, payload):
+    return struct.pack(">I", len(payload)) + kind + payload + struct.pack(">I", zlib.crc32(kind + payload))
+
+
+def strip_png(data, orientation):
+    out = [PNG_SIGNATURE]
+    for kind, offset, length in png_chunks(data):
+        if kind not in PNG_PRIVATE_CHUNKS:
+            out.append(data[offset - 8 : offset + length + 4])
+        if kind == b"IHDR" and orientation != 1:
+            out.append(png_chunk(b"eXIf", orientation_tiff(orientation)))
+    return b"".join(out)
+
+
+def riff_chunks(data_or_file):
+    # Yields (type, data offset, data length) for the chunks of a WebP file.
+    if isinstance(data_or_file, (bytes, bytearray)):
+        end = min(len(data_or_file), struct.unpack_from("<I", data_or_file, 4)[0] + 8)
+        offset = 12
+        while offset + 8 <= end:
+            kind, length = struct.unpack_from("<4sI", data_or_file, offset)
+            yield kind, offset + 8, length
+            offset += 8 + length + (length & 1)
+        return
+    f = data_or_file
+    f.seek(4)
+    end = struct.unpack("<I", read_exact(f, 4))[0] + 8
+    offset = 12
+    while offset + 8 <= end:
+        f.seek(offset)
+        header = f.read(8)
+        if len(header) < 8:
+            return
+        kind, length = struct.unpack("<4sI", header)
+        yield kind, offset + 8, length
+        offset += 8 + length + (length & 1)
+
+
+def webp_size(header):
+    chunk = header[12:16]
+    if chunk == b"VP8 " and header[23:26] == b"\x9d\x01\x2a":
+        width, height = struct.unpack("<HH", header[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L" and header[20] == 0x2F:
+        bits = struct.unpack("<I", header[21:25])[0]
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X":
+        width = int.from_bytes(header[24:27], "little") + 1
+        height = int.from_bytes(header[27:30], "little") + 1
+        return width, height
+    return None
+
+
+def webp_header(f, head):
+    header = {"size": webp_size(head), "exif": None, "private": False}
+    for kind, _, length in riff_chunks(f):
+        if kind in WEBP_PRIVATE_CHUNKS:
+            header["private"] = True
+            if kind == b"EXIF":
+                header["exif"] = read_exact(f, length)
+    if header["exif"] and header["exif"].startswith(EXIF_HEADER):
+        header["exif"] = header["exif"][len(EXIF_HEADER) :]
+    return header
+
+
+def strip_webp(data, orientation):
+    chunks = []
+    extended = False
+    for kind, offset, length in riff_chunks(data):
+        if kind in WEBP_PRIVATE_CHUNKS:
+            continue
+        chunk = bytearray(data[offset - 8 : offset + length + (length & 1)])
+        if kind == b"VP8X":
+            extended = True
+            chunk[8] &= ~(WEBP_EXIF_FLAG | WEBP_XMP_FLAG) & 0xFF
+            if orientation != 1:
+                chunk[8] |= WEBP_EXIF_FLAG
+        chunks.append(bytes(chunk))
+    # Only the extended format can carry EXIF; its chunk follows the image data.
+    if extended and orientation != 1:
+        exif = orientation_tiff(orientation)
+        chunks.append(b"EXIF" + struct.pack("<I", len(exif)) + exif + b"\x00" * (len(exif) & 1))
+    body = b"WEBP" + b"".join(chunks)
+    return b"RIFF" + struct.pack("<I", len(body)) + body
+
+
+def heif_boxes(data, start=0, end=None):
+    # Yields (type, payload start, payload end) for the boxes in data[start:end].
+    end = len(data) if end is None else end
+    offset = start
+    while offset + 8 <= end:
+        size, kind = struct.unpack_from(">I4s", data, offset)
+        header = 8
+        if size == 1:
+            if offset + 16 > end:
+                return
+            size = struct.unpack_from(">Q", data, offset + 8)[0]
+            header = 16
+        elif size == 0:
+            size = end - offset
+        if size < header or offset + size > end:
+            return
+        yield kind, offset + header, offset + size
+        offset += size
+
+
+def heif_meta(f):
+    # Returns (file offset, payload) of the top-level meta box, skipping mdat
+    # and the other boxes by seeking.
+    f.seek(0)
+    ftyp = None
+    while True:
+        header = f.read(8)
+        if len(header) < 8:
+            return None
+        size, kind = struct.unpack(">I4s", header)
+        header_size = 8
+        if size == 1:
+            size = struct.unpack(">Q", read_exact(f, 8))[0]
+            header_size = 16
+        if kind == b"ftyp":
+            ftyp = read_exact(f, size - header_size)
+            brands = {ftyp[:4]} | {ftyp[i : i + 4] for i in range(8, len(ftyp) - 3, 4)}
+            if not brands & HEIF_BRANDS:
+                return None
+            continue
+        if ftyp is None:
+            return None
+        if kind == b"meta":
+            if size == 0 or size - header_size > HEIF_META_LIMIT:
+                return None
+            return f.tell(), read_exact(f, size - header_size)
+        if size == 0 or size < header_size:
+            return None
+        f.seek(size - header_size, 1)
+
+
+def heif_items(meta, meta_offset):
+    # Parses the meta box payload into the primary item's size and
+    # orientation and the file extents of its Exif and XMP items.
+    info = {"primary": None, "types": {}, "extents": {}, "properties": [], "associations": {}}
+    idat = None
+    # meta is a full box: version and flags come first.
+    for kind, start, end in heif_boxes(meta, 4):
+        version = meta[start]
+        if kind == b"pitm":
+            info["primary"] = struct.unpack_from(">H" if version == 0 else ">I", meta, start + 4)[0]
+        elif kind == b"idat":
+            idat = meta_offset + start
+        elif kind == b"iinf":
+            first = start + (6 if version == 0 else 8)
+            for entry, entry_start, entry_end in heif_boxes(meta, first, end):
+                entry_version = meta[entry_start]
+                if entry != b"infe" or entry_version < 2:
+                    continue
+                position = entry_start + 4
+                id_size = 2 if entry_version == 2 else 4
+                item_id = int.from_bytes(meta[position : position + id_size], "big")
+                position += id_size + 2
+                item_type = meta[position : position + 4]
+                if item_type == b"mime":
+                    names = meta[position + 4 : entry_end].split(b"\x00")
+                    item_type = names[1] if len(names) > 1 else b""
+                info["types"][item_id] = item_type
+        elif kind == b"iloc":
+            offset_size, length_size = meta[start + 4] >> 4, meta[start + 4] & 0x0F
+            base_size = meta[start + 5] >> 4
+            index_size = meta[start + 5] & 0x0F if version in (1, 2) else 0
+            position = start + 6
+            count_size = 2 if version < 2 else 4
+            count = int.from_bytes(meta[position : position + count_size], "big")
+            position += count_size
+
+            def number(size):
+                nonlocal position
+                value = int.from_bytes(meta[position : position + size], "big")
+                position += size
+                return value
+
+            for _ in range(count):
+                item_id = number(count_size)
+                method = number(2) & 0x0F if version in (1, 2) else 0
+                number(2)
+                base = number(base_size)
+                extents = []
+                for _ in range(number(2)):
+                    number(index_size)
+                    extent_offset = number(offset_size)
+                    extents.append((method, base + extent_offset, number(length_size)))
+                info["extents"][item_id] = extents
+        elif kind == b"iprp":
+            for child, child_start, child_end in heif_boxes(meta, start, end):
+                if child == b"ipco":
+                    info["properties"] = [
+                        (prop, meta[prop_start:prop_end]) for prop, prop_start, prop_end in heif_boxes(meta, child_start, child_end)
+                    ]
+                elif child == b"ipma":
+                    ipma_version, flags = meta[child_start], meta[child_start + 3]
+                    position = child_start + 4
+                    count = struct.unpack_from(">I", meta, position)[0]
+                    position += 4
+                    for _ in range(count):
+                        id_size = 2 if ipma_version < 1 else 4
+                        item_id = int.from_bytes(meta[position : position + id_size], "big")
+                        position += id_size
+                        associations = []
+                        for _ in range(meta[position]):
+                            if flags & 1:
+                                associations.append(struct.unpack_from(">H", meta, position + 1)[0] & 0x7FFF)
+                                position += 2
+                            else:
+                                associations.append(meta[position + 1] & 0x7F)
+                                position += 1
+                        position += 1
+                        info["associations"][item_id] = associations
+    for item_id, extents in info["extents"].items():
+        info["extents"][item_id] = [
+            (offset + (idat if method == 1 else 0), length)
+            for method, offset, length in extents
+            if method == 0 or (method == 1 and idat is not None)
+        ]
+    return info
+
+
+def heif_properties(info):
+    # The primary item's properties; without item associations, all of them.
+    properties = info["properties"]
+    indices = info["associations"].get(info["primary"])
+    if indices is None:
+        return properties
+    return [properties[index - 1] for index in indices if 0 < index <= len(properties)]
+
+
+def heif_header(f):
+    found = heif_meta(f)
+    if found is None:
+        return {"size": None, "exif": None, "private": False}
+    info = heif_items(found[1], found[0])
+    sizes = []
+    angle, axis = 0, None
+    for kind, payload in heif_properties(info):
+        if kind == b"ispe" and len(payload) >= 12:
+            sizes.append(struct.unpack_from(">II", payload, 4))
+        elif kind == b"irot" and payload:
+            angle = payload[0] & 0x03
+        elif kind == b"imir" and payload:
+            axis = payload[0] & 0x01
+    header = {
+        "size": max(sizes, key=lambda size: size[0] * size[1]) if sizes else None,
+        "exif": None,
+        # Decoders apply irot and imir; EXIF orientation in AVIF is ignored.
+        "orientation": HEIF_ORIENTATIONS.get((angle, axis), 1),
+        "private": False,
+    }
+    for item_id, item_type in info["types"].items():
+        if item_type not in (b"Exif", HEIF_XMP_TYPE):
+            continue
+        header["private"] = True
+        extents = info["extents"].get(item_id, [])
+        if item_type == b"Exif" and extents and header["exif"] is None:
+            payload = b""
+            for offset, length in extents:
+                f.seek(offset)
+                payload += read_exact(f, length)
+            header["exif"] = payload[4 + struct.unpack_from(">I", payload)[0] :]
+    return header
+
+
+def strip_heif(data):
+    # Item extents cannot be removed without rewriting every offset, so the
+    # Exif and XMP payloads are overwritten in place with empty ones.
+    data = bytearray(data)
+    found = heif_meta(io.BytesIO(data))
+    if found is None:
+        raise ValueError("no HEIF metadata box")
+    info = heif_items(found[1], found[0])
+    for item_id, item_type in info["types"].items():
+        extents = info["extents"].get(item_id, [])
+        total = sum(length for _, length in extents)
+        if item_type == b"Exif":
+            payload = struct.pack(">I", 0) + orientation_tiff(1)
+        elif item_type == HEIF_XMP_TYPE:
+            payload = XMP_EMPTY + XMP_END
+            padding = total - len(payload)
+            payload = XMP_EMPTY + b" " * padding + XMP_END if padding >= 0 else b""
+        else:
+            continue
+        payload = payload[:total].ljust(total, b"\x00" if item_type == b"Exif" else b" ")
+        for offset, length in extents:
+            data[offset : offset + length], payload = payload[:length], payload[length:]
+    return bytes(data)
+
+
+def svg_length(value):
+    # Only absolute user units; percentages, em and friends depend on the page.
+    match = SVG_LENGTH_PATTERN.match(value or "")
+    return float(match.group(1)) if match else None
+
+
+def svg_size(f):
+    head = f.read(SVG_HEAD_BYTES).decode("utf-8", "replace")
+    match = SVG_TAG_PATTERN.search(head)
+    if not match:
+        return None
+    attributes = {name: value[1:-1] for name, value in SVG_ATTRIBUTE_PATTERN.findall(match.group(1))}
+    width = svg_length(attributes.get("width"))
+    height = svg_length(attributes.get("height"))
+    view_box = None
+    try:
+        view_box = [float(part) for part in re.split(r"[\s,]+", attributes.get("viewBox", "").strip())]
+    except ValueError:
+        pass
+    if view_box and len(view_box) == 4 and view_box[2] > 0 and view_box[3] > 0:
+        if width and not height:
+            height = width * view_box[3] / view_box[2]
+        elif height and not width:
+            width = height * view_box[2] / view_box[3]
+        elif not width and not height:
+            width, height = view_box[2], view_box[3]
+    if not width or not height:
+        return None
+    return max(1, round(width)), max(1, round(height))
+
+
+def read_header(path):
+    with open(path, "rb") as f:
+        head = f.read(32)
+        f.seek(0)
+        if head.startswith(PNG_SIGNATURE):
+            return png_header(f)
+        if head[:6] in (b"GIF87a", b"GIF89a"):
+            return {"size": struct.unpack("<HH", head[6:10]), "exif": None, "private": False}
+        if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+            return webp_header(f, head)
+        if head[:2] == b"\xff\xd8":
+            return jpeg_header(f)
+        if head[4:8] == b"ftyp":
+            return heif_header(f)
+        if str(path).lower().endswith(".svg"):
+            return {"size": svg_size(f), "exif": None, "private": False}
+    return {"size": None, "exif": None, "private": False}
+
+
+def read_metadata(path):
+    # {"width", "height", "orientation", "taken", "private"}: the size as
+    # displayed (swapped for orientations 5-8), the EXIF orientation and
+    # capture time (ISO, local camera time) and whether strip_metadata()
+    # would remove anything. Missing values are left out. Files whose header
+    # or EXIF block cannot be parsed fail closed: they are marked private
+    # (and "unreadable" if not even the header could be read), so they are
+    # stripped or not published at all.
+    try:
+        header = read_header(path)
+    except (OSError, ValueError, struct.error, IndexError):
+        return dict(UNREADABLE)
+    if header["size"] is None and not str(path).lower().endswith(".svg"):
+        return dict(UNREADABLE)
+    orientation, taken = 1, None
+    if header["exif"]:
+        try:
+            orientation, taken = exif_fields(header["exif"])
+        except (ValueError, struct.error, IndexError):
+            header["private"] = True
+    orientation = header.get("orientation", orientation)
+    metadata = {}
+    if header["size"]:
+        width, height = header["size"]
+        metadata["width"], metadata["height"] = (height, width) if orientation >= 5 else (width, height)
+    if orientation != 1:
+        metadata["orientation"] = orientation
+    if taken:
+        metadata["taken"] = taken
+    if header["private"]:
+        metadata["private"] = True
+    return metadata
+
+
+def strip_metadata(data, orientation=1):
+    # Returns data without metadata; see the top of this module.
+    if data.startswith(PNG_SIGNATURE):
+        return strip_png(data, orientation)
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return strip_webp(data, orientation)
+    if data[:2] == b"\xff\xd8":
+        return strip_jpeg(data, orientation)
+    if data[4:8] == b"ftyp":
+        return strip_heif(data)
+    raise ValueError("unsupported image format")
@@ -0,0 +1,78 @@
+import gzip
+import sys
+from pathlib import Path
+
+from fileio import write_atomic
+
+try:
+    import brotli
+except ImportError:  # optional; without it only .gz siblings are written
+    brotli = None
+
+
+TEXT_EXTENSIONS = {".html", ".css", ".js", ".json", ".svg", ".txt", ".xml", ".ics"}
+# Below this size compression saves less than the extra file costs.
+MIN_SIZE = 256
+
+
+def encoders():
+    yield ".gz", lambda data: gzip.compress(data, compresslevel=9, mtime=0)
+    if brotli is not None:
+        yield ".br", lambda data: brotli.compress(data, quality=11)
+
+
+def is_compressible(path):
+    return path.suffix.lower() in TEXT_EXTENSIONS and not path.name.startswith(".")
+
+
+def precompress(path):
+    # Siblings carry the mtime of their source, so an up-to-date sibling is
+    # recognised by stat alone and never recompressed.
+    path = Path(path)
+    stat = path.stat()
+    written = 0
+    data = None
+    for suffix, encode in encoders():
+        target = path.with_name(path.name + suffix)
+        if stat.st_size < MIN_SIZE:
+            target.unlink(missing_ok=True)
+            continue
+        try:
+            if target.stat().st_mtime_ns == stat.st_mtime_ns:
+                continue
+        except FileNotFoundError:
+            pass
+        if data is None:
+            data = path.read_bytes()
+        write_atomic(target, encode(data), stat.st_mtime_ns)
+        written += 1
+    return written
+
+
+def precompress_tree(root):
+    written = 0
+    for path in sorted(Path(root).rglob("*")):
+        if path.suffix in (".gz", ".br"):
+            # Only siblings this tool wrote: downloads such as .tar.gz stay.
+            source = path.with_suffix("")
+            if is_compressible(source) and not source.exists():
+                path.unlink()
+            continue
+        if path.is_file() and is_compressible(path):
+            written += precompress(path)
+    return written
+
+
+def main(argv):
+    if len(argv) < 2:
+        raise SystemExit("Usage: precompress.py FILE_OR_DIR...")
+    for arg in argv[1:]:
+        path = Path(arg)
+        if path.is_dir():
+            precompress_tree(path)
+        else:
+            precompress(path)
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,294 @@
+import json
+import re
+import sys
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+
+# Python port of the renderer in static/news.html (used there without a
+# pre-rendered list and for ?debug); keep both in sync so pre-rendered and
+# client-rendered news look identical.
+LOCAL_TZ = ZoneInfo("Europe/Berlin")
+PLACEHOLDER_PATTERN = re.compile("\u0000(\\d+)\u0000")
+CODE_PATTERN = re.compile(r"`([^`]+)`")
+LINK_PATTERN = re.compile(r"\[([^\]]+)\]\(([^)\s]+)\)")
+STRONG_PATTERN = re.compile(r"\*\*([^*]+)\*\*")
+EM_PATTERN = re.compile(r"\*([^*]+)\*")
+UNORDERED_PATTERN = re.compile(r"^[-*+]\s+(.+)$")
+ORDERED_PATTERN = re.compile(r"^(\d+)\.\s+(.+)$")
+SAFE_SCHEME_PATTERN = re.compile(r"^(https?:|mailto:|tel:)", re.IGNORECASE)
+RELATIVE_URL_PATTERN = re.compile(r"^[./#?]")
+ANY_SCHEME_PATTERN = re.compile(r"^[a-z][a-z0-9+.-]*:", re.IGNORECASE)
+ISO_DATE_PATTERN = re.compile(r"^(\d{4})-(\d{2})-(\d{2})$")
+DOTTED_DATE_PATTERN = re.compile(r"^(\d{1,2})\.(\d{1,2})\.(\d{4})$")
+DASHED_DATE_PATTERN = re.compile(r"^(\d{1,2})-(\d{1,2})-(\d{4})$")
+DRAFT_VALUES = {"false", "0", "no", "nein", "off"}
+FEATURED_VALUES = {"true", "1", "yes", "ja", "on"}
+
+
+def text_value(value):
+    # String(value || "") in the client renderer: falsy values (null, false,
+    # 0, NaN, "") are empty, true and whole floats print as in JavaScript.
+    if not value or value != value:
+        return ""
+    if value is True:
+        return "true"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def escape_html(value):
+    return (
+        text_value(value)
+        .replace("&", "&amp;")
+        .replace("<", "&lt;")
+        .replace(">", "&gt;")
+        .replace('"', "&quot;")
+        .replace("'", "&#39;")
+    )
+
+
+def sanitize_url(value):
+    url = text_value(value).strip()
+    if not url:
+        return ""
+    if (
+        SAFE_SCHEME_PATTERN.match(url)
+        or RELATIVE_URL_PATTERN.match(url)
+        or not ANY_SCHEME_PATTERN.match(url)
+    ):
+        return url
+    return ""
+
+
+def render_inline_markdown(value):
+    placeholders = []
+
+    def stash(html):
+        placeholders.append(html)
+        return f"\u0000{len(placeholders) - 1}\u0000"
+
+    def link(match):
+        label, url = match.groups()
+        safe_url = sanitize_url(url)
+        if not safe_url:
+            return label
+        return stash(f'<a href="{escape_html(safe_url)}">{label}</a>')
+
+    text = escape_html(value)
+    text = CODE_PATTERN.sub(lambda m: stash(f"<code>{m.group(1)}</code>"), text)
+    text = LINK_PATTERN.sub(link, text)
+    text = STRONG_PATTERN.sub(r"<strong>\1</strong>", text)
+    text = EM_PATTERN.sub(r"<em>\1</em>", text)
+
+    def restore(match):
+        index = int(match.group(1))
+        return placeholders[index] if index < len(placeholders) else ""
+
+    return PLACEHOLDER_PATTERN.sub(restore, text)
+
+
+def render_markdown(value):
+    lines = re.sub(r"\r\n?", "\n", text_value(value)).split("\n")
+    html = []
+    paragraph = []
+    list_type = None
+    list_items = []
+
+    def flush_paragraph():
+        if paragraph:
+            html.append(f"<p>{render_inline_markdown(' '.join(paragraph))}</p>")
+            paragraph.clear()
+
+    def flush_list():
+        nonlocal list_type
+        if list_type and list_items:
+            items = "".join(f"<li>{render_inline_markdown(item)}</li>" for item in list_items)
+            html.append(f"<{list_type}>{items}</{list_type}>")
+        list_type = None
+        list_items.clear()
+
+    for line in lines:
+        trimmed = line.strip()
+        unordered = UNORDERED_PATTERN.match(trimmed)
+        ordered = ORDERED_PATTERN.match(trimmed)
+        if not trimmed:
+            flush_paragraph()
+            flush_list()
+        elif unordered:
+            flush_paragraph()
+            if list_type != "ul":
+                flush_list()
+                list_type = "ul"
+            list_items.append(unordered.group(1))
+        elif ordered:
+            flush_paragraph()
+            if list_type != "ol":
+                flush_list()
+                list_type = "ol"
+            list_items.append(ordered.group(2))
+        else:
+            flush_list()
+            paragraph.append(trimmed)
+
+    flush_paragraph()
+    flush_list()
+    return "".join(html) or "<p></p>"
+
+
+def parse_publication_date_key(value):
+    text = text_value(value).strip()
+    if not text:
+        return ""
+    match = ISO_DATE_PATTERN.match(text)
+    if match:
+        return "-".join(match.groups())
+    match = DOTTED_DATE_PATTERN.match(text) or DASHED_DATE_PATTERN.match(text)
+    if match:
+        day, month, year = match.groups()
+        return f"{year}-{int(month):02d}-{int(day):02d}"
+    return ""
+
+
+def berlin_today_key():
+    return datetime.now(LOCAL_TZ).date().isoformat()
+
+
+def is_legacy_draft(item):
+    value = item.get("published")
+    if value is False:
+        return True
+    if isinstance(value, str):
+        return value.strip().lower() in DRAFT_VALUES
+    return False
+
+
+def is_featured(item):
+    value = item.get("featured")
+    if value is True:
+        return True
+    if isinstance(value, str):
+        return value.strip().lower() in FEATURED_VALUES
+    return False
+
+
+def is_published(item, today):
+    from_raw = text_value(item.get("published_from")).strip()
+    until_raw = text_value(item.get("published_until")).strip()
+    from_key = parse_publication_date_key(from_raw)
+    until_key = parse_publication_date_key(until_raw)
+    if (from_raw and not from_key) or (until_raw and not until_key):
+        return False
+    if not (from_raw or until_raw) and is_legacy_draft(item):
+        return False
+    if from_key and today < from_key:
+        return False
+    if until_key and today > until_key:
+        return False
+    return True
+
+
+def publication_boundaries(item):
+    # Days on which the item can appear or disappear: published_from itself
+    # and the day after published_until. Invalid dates never become visible.
+    from_raw = text_value(item.get("published_from")).strip()
+    until_raw = text_value(item.get("published_until")).strip()
+    from_key = parse_publication_date_key(from_raw)
+    until_key = parse_publication_date_key(until_raw)
+    if (from_raw and not from_key) or (until_raw and not until_key):
+        return []
+    boundaries = []
+    for key, offset in ((from_key, 0), (until_key, 1)):
+        if key:
+            try:
+                day = date.fromisoformat(key) + timedelta(days=offset)
+            except ValueError:
+                continue
+            boundaries.append(day.isoformat())
+    return boundaries
+
+
+def next_boundary(items, today):
+    upcoming = [key for item in items for key in publication_boundaries(item) if key > today]
+    return min(upcoming, default=None)
+
+
+def boundary_datetime(key):
+    return datetime.combine(date.fromisoformat(key), datetime.min.time(), tzinfo=LOCAL_TZ)
+
+
+def visibility(items, today):
+    # Indices of the items each fragment shows; equal signatures render equally.
+    published = [index for index, item in enumerate(items) if is_published(item, today)]
+    return {
+        "news-list": published,
+        "news-featured": [index for index in published if is_featured(items[index])],
+    }
+
+
+def load_news(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return []
+    if not isinstance(data, list):
+        raise ValueError("news.json must be a list")
+    return [item for item in data if isinstance(item, dict)]
+
+
+def render_card(item, always_show_actions):
+    flyer_url = sanitize_url(item.get("flyer_url"))
+    flyer_text = escape_html(item.get("flyer_text"))
+    if flyer_url:
+        flyer_label = escape_html(item.get("flyer_label") or "Flyer (PDF)")
+        action_html = f'<a class="button" href="{escape_html(flyer_url)}">{flyer_label}</a>'
+    elif flyer_text or always_show_actions:
+        action_html = f'<span class="muted">{flyer_text}</span>'
+    else:
+        action_html = ""
+    actions = f'<div class="news-actions">{action_html}</div>' if action_html else ""
+    return (
+        '<article class="news-card">'
+        f'<div class="news-meta">{escape_html(item.get("date"))}</div>'
+        f"<h2>{escape_html(item.get('title'))}</h2>"
+        f'<div class="news-body">{render_markdown(item.get("text"))}</div>'
+        f"{actions}"
+        "</article>"
+    )
+
+
+def visible_items(items, today):
+    return [item for item in items if is_published(item, today)]
+
+
+def render_news_list(items, today):
+    published = visible_items(items, today)
+    if not published:
+        return "<p>Keine News vorhanden.</p>"
+    return "".join(render_card(item, always_show_actions=True) for item in published)
+
+
+def render_featured(items, today):
+    featured = [item for item in visible_items(items, today) if is_featured(item)]
+    cards = "".join(render_card(item, always_show_actions=False) for item in featured)
+    hidden = "" if featured else " hidden"
+    return f'<section id="home-featured" class="home-featured news-list"{hidden}>{cards}</section>'
+
+
+def main(argv):
+    if len(argv) not in (3, 4):
+        raise SystemExit("Usage: render_news.py news.json list|featured [YYYY-MM-DD]")
+    items = load_news(argv[1])
+    today = argv[3] if len(argv) == 4 else berlin_today_key()
+    if argv[2] == "list":
+        print(render_news_list(items, today))
+    elif argv[2] == "featured":
+        print(render_featured(items, today))
+    else:
+        raise SystemExit(f"Unknown fragment: {argv[2]}")
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -1,11 +1,88 @@
 #!/usr/bin/env python3
 import argparse
+import base64
+import functools
+import hashlib
+import io
 import json
+import os
 import re
+import shutil
+import struct
+import sys
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+try:
+    from PIL import Image, features
+except ImportError:  # optional; without it gallery.json lists the originals only
+    Image = None
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR))
+import image_headers  # noqa: E402
+from fileio import file_record, indexed_names, load_json_object, replacing, write_atomic, write_if_changed  # noqa: E402
+
 
 VALID_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".gif", ".avif", ".svg"}
+# Photos get resized variants; SVGs scale by themselves and GIFs may be animated.
+RASTER_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".avif"}
+URL_PREFIX = "gallery-pics"
+# Variants are written to gallery-pics/variants/ next to gallery.json, named
+# photo-640.<hash>.webp with a hash of the source and the variant spec, so they
+# can be cached as immutable like the fingerprinted assets.
+VARIANTS_DIR = "variants"
+HASH_LENGTH = 10
+# The smallest width doubles as the grid thumbnail; larger ones serve the
+# lightbox. Images are never upscaled.
+WIDTHS = (320, 640, 1024, 1600)
+# Preferred format first; the last one is the fallback every browser shows.
+FORMATS = (
+    ("avif", "image/avif", {"quality": 50}),
+    ("webp", "image/webp", {"quality": 78, "method": 6}),
+    ("jpeg", "image/jpeg", {"quality": 82, "optimize": True, "progressive": True}),
+)
+# Images with transparency fall back to PNG instead of JPEG.
+ALPHA_FALLBACK = ("png", "image/png", {"optimize": True})
+# Each item carries its average colour and a tiny blurred preview as a data URI,
+# painted while the thumbnail loads. PLACEHOLDER_SIZE bounds the longer side.
+PLACEHOLDER_SIZE = 16
+PLACEHOLDER_FORMATS = (
+    ("webp", "image/webp", {"quality": 40}),
+    ("jpeg", "image/jpeg", {"quality": 40}),
+)
+# gallery.json is a small index of albums; each album's items are split into
+# pages (gallery-pics/pages/<album>-<n>.<hash>.json) named by content hash, so
+# only the index has to be fetched fresh. Subdirectories of gallery-pics are
+# albums; photos at its top level form ROOT_ALBUM.
+PAGES_DIR = "pages"
+PAGE_SIZE = 24
+PAGE_PATTERN = re.compile(r"^[a-z0-9-]+-\d+\.[0-9a-f]{10}\.json$")
+ROOT_ALBUM = ("allgemein", "Allgemein")
+# Variants are generated once into the cache and linked into the site; the
+# cache index maps source hash plus variant spec to the variants written.
+# The header metadata (size, EXIF orientation and capture time) is cached per
+# content hash as well, so every item (SVGs and GIFs included, with or without
+# Pillow) gets width and height without reading any file twice.
+DEFAULT_CACHE_DIR = BASE_DIR / ".cache" / "gallery"
+CACHE_INDEX = "index.json"
+CACHE_VERSION = 4
+# Originals are published next to gallery.json under their own path. Those
+# with EXIF, XMP or comments (GPS position, camera serial numbers) are
+# published as a copy without them, kept in the cache by content hash.
+ORIGINALS_DIR = "originals"
+# EXIF orientation -> the transposition that shows the image upright.
+TRANSPOSE = {
+    2: "FLIP_LEFT_RIGHT",
+    3: "ROTATE_180",
+    4: "FLIP_TOP_BOTTOM",
+    5: "TRANSPOSE",
+    6: "ROTATE_270",
+    7: "TRANSVERSE",
+    8: "ROTATE_90",
+}
+DATE_PREFIX_PATTERN = re.compile(r"^(\d{4}-\d{2}-\d{2})-")
 
 
 def caption_from_filename(filename):
@@ -19,29 +96,460 @@ def caption_from_filename(filename):
     return caption.title() if caption else stem.replace("-", " ").strip().title()
 
 
-def collect_images(images_dir):
-    items = []
-    for path in sorted(images_dir.iterdir()):
-        if not path.is_file():
+def image_formats(has_alpha):
+    formats = [fmt for fmt in FORMATS[:-1] if features.check(fmt[0])]
+    formats.append(ALPHA_FALLBACK if has_alpha else FORMATS[-1])
+    return formats
+
+
+def target_widths(width):
+    return sorted({w for w in WIDTHS if w < width} | {min(width, WIDTHS[-1])})
+
+
+def placeholder_format():
+    return next(fmt for fmt in PLACEHOLDER_FORMATS if fmt[0] == "jpeg" or features.check(fmt[0]))
+
+
+def variant_spec():
+    # Changes whenever the widths, formats or encoder options do, so cached
+    # variants from another spec are regenerated (and collected).
+    spec = [WIDTHS, image_formats(False), image_formats(True), PLACEHOLDER_SIZE, placeholder_format()]
+    return hashlib.sha256(json.dumps(spec, sort_keys=True).encode("utf-8")).hexdigest()[:HASH_LENGTH]
+
+
+def variant_name(stem, source_hash, width, fmt, options, orientation=1):
+    spec = json.dumps([source_hash, width, fmt, options, orientation], sort_keys=True)
+    digest = hashlib.sha256(spec.encode("utf-8")).hexdigest()[:HASH_LENGTH]
+    extension = "jpg" if fmt == "jpeg" else fmt
+    return f"{stem}-{width}.{digest}.{extension}"
+
+
+def save_variant(image, path, fmt, options):
+    with replacing(path) as tmp_path:
+        image.save(tmp_path, format=fmt.upper(), **options)
+
+
+def placeholder_fields(image):
+    # image is RGB or RGBA; transparent areas are shown on white like the page.
+    if image.mode == "RGBA":
+        flat = Image.new("RGB", image.size, (255, 255, 255))
+        flat.paste(image, mask=image.getchannel("A"))
+        image = flat
+    red, green, blue = image.resize((1, 1), Image.BOX).getpixel((0, 0))
+    preview = image.copy()
+    preview.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE), Image.BOX)
+    fmt, mime, options = placeholder_format()
+    buffer = io.BytesIO()
+    preview.save(buffer, format=fmt.upper(), **options)
+    return {
+        "color": f"#{red:02x}{green:02x}{blue:02x}",
+        "lqip": f"data:{mime};base64,{base64.b64encode(buffer.getvalue()).decode('ascii')}",
+    }
+
+
+def render_variants(path, source_hash, store_dir, orientation=1):
+    # Runs in the worker processes; returns the cache entry for one image.
+    # Variants are turned upright and carry no metadata.
+    with Image.open(path) as image:
+        image.load()
+        has_alpha = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+        image = image.convert("RGBA" if has_alpha else "RGB")
+    if orientation in TRANSPOSE:
+        image = image.transpose(getattr(Image.Transpose, TRANSPOSE[orientation]))
+    image.info = {}
+    width, height = image.size
+    variants = []
+    for target in target_widths(width):
+        resized = image
+        if target != width:
+            resized = image.resize((target, max(1, round(height * target / width))), Image.LANCZOS)
+        for fmt, mime, options in image_formats(has_alpha):
+            name = variant_name(path.stem, source_hash, target, fmt, options, orientation)
+            save_variant(resized, store_dir / name, fmt, options)
+            variants.append(
+                {
+                    "name": name,
+                    "type": mime,
+                    "width": resized.width,
+                    "height": resized.height,
+                    "bytes": (store_dir / name).stat().st_size,
+                }
+            )
+    return {"width": width, "height": height, **placeholder_fields(image), "variants": variants}
+
+
+def load_cache(cache_dir):
+    cache = load_json_object(cache_dir / CACHE_INDEX)
+    if cache.get("version") != CACHE_VERSION:
+        return {"sources": {}, "metadata": {}, "images": {}}
+    return cache
+
+
+def save_cache(cache_dir, sources, metadata, images):
+    data = json.dumps(
+        {"version": CACHE_VERSION, "sources": sources, "metadata": metadata, "images": images},
+        ensure_ascii=False,
+        sort_keys=True,
+    )
+    write_atomic(cache_dir / CACHE_INDEX, data.encode("utf-8"))
+
+
+def run_jobs(pending, store_dir, jobs):
+    # pending maps cache keys to (path, source hash, orientation); returns
+    # key -> entry for the images that could be read.
+    results = {}
+
+    def collect(key, path, call):
+        try:
+            results[key] = call()
+        except (OSError, ValueError, Image.DecompressionBombError) as exc:
+            print(f"WARNING: No variants for {path.name}: {exc}")
+
+    if jobs <= 1 or len(pending) <= 1:
+        for key, (path, digest, orientation) in pending.items():
+            collect(key, path, functools.partial(render_variants, path, digest, store_dir, orientation))
+        return results
+    with ProcessPoolExecutor(max_workers=min(jobs, len(pending))) as pool:
+        futures = {
+            key: pool.submit(render_variants, path, digest, store_dir, orientation)
+            for key, (path, digest, orientation) in pending.items()
+        }
+        for key, future in futures.items():
+            collect(key, pending[key][0], future.result)
+    return results
+
+
+def sync_dir(names, source_dir, target_dir):
+    # Makes target_dir hold exactly names, linked (or copied) from source_dir.
+    target_dir.mkdir(parents=True, exist_ok=True)
+    present = {entry.name for entry in os.scandir(target_dir)}
+    for name in names - present:
+        try:
+            os.link(source_dir / name, target_dir / name)
+        except OSError:
+            shutil.copy2(source_dir / name, target_dir / name)
+    for name in present - names:
+        (target_dir / name).unlink()
+
+
+def update_variants(paths, sources, metadata, cached, variants_dir, cache_dir=DEFAULT_CACHE_DIR, jobs=1):
+    # Returns (path -> entry, cache key -> entry) for the raster images in
+    # paths; sources and metadata hold their records and cached the previous
+    # entries.
+    # Only images whose content or variant spec is not cached yet are
+    # rendered; variants no image refers to any more are removed from the
+    # cache and from variants_dir.
+    store_dir = Path(cache_dir) / VARIANTS_DIR
+    store_dir.mkdir(parents=True, exist_ok=True)
+    stored = {entry.name for entry in os.scandir(store_dir)}
+    spec = variant_spec()
+    keys = {}
+    pending = {}
+    for path in paths:
+        if path.suffix.lower() not in RASTER_EXTENSIONS:
             continue
-        if path.suffix.lower() not in VALID_EXTENSIONS:
+        source = sources[path.as_posix()]
+        key = keys[path] = f"{source['sha256']}-{spec}"
+        entry = cached.get(key)
+        if key not in pending and (entry is None or any(v["name"] not in stored for v in entry["variants"])):
+            orientation = metadata[source["sha256"]].get("orientation", 1)
+            pending[key] = (path, source["sha256"], orientation)
+
+    rendered = run_jobs(pending, store_dir, jobs)
+    images = {}
+    for key in set(keys.values()):
+        entry = rendered.get(key) if key in pending else cached.get(key)
+        if entry is not None:
+            images[key] = entry
+
+    names = {variant["name"] for entry in images.values() for variant in entry["variants"]}
+    for name in {entry.name for entry in os.scandir(store_dir)} - names:
+        (store_dir / name).unlink()
+    sync_dir(names, store_dir, variants_dir)
+    return {path: images[key] for path, key in keys.items() if key in images}, images
+
+
+def link_file(source, target):
+    # Like sync_dir for a single file: skipped while target is source or a
+    # copy with the same size and mtime.
+    try:
+        if os.path.samefile(source, target):
+            return
+        current, wanted = target.stat(), source.stat()
+        if (current.st_size, current.st_mtime_ns) == (wanted.st_size, wanted.st_mtime_ns):
+            return
+    except FileNotFoundError:
+        pass
+    target.parent.mkdir(parents=True, exist_ok=True)
+    with replacing(target) as tmp_path:
+        try:
+            os.link(source, tmp_path)
+        except OSError:
+            shutil.copy2(source, tmp_path)
+
+
+def publish_originals(images_dir, paths, sources, metadata, target_dir, cache_dir=DEFAULT_CACHE_DIR, previous=()):
+    # Links every original into target_dir under its path below images_dir,
+    # with metadata stripped where image_headers found any, and removes the
+    # previously published ones (paths relative to target_dir, see
+    # indexed_sources) that are no longer listed. An original that cannot be
+    # stripped is not published at all. Returns the paths published; nothing
+    # is linked when gallery.json is written into images_dir itself.
+    if target_dir.resolve() == images_dir.resolve():
+        return set(paths)
+    store_dir = Path(cache_dir) / ORIGINALS_DIR
+    published = set()
+    listed = set()
+    stripped = set()
+    for path in paths:
+        rel = path.relative_to(images_dir).as_posix()
+        digest = sources[path.as_posix()]["sha256"]
+        details = metadata[digest]
+        source = path
+        if details.get("private"):
+            source = store_dir / f"{digest}{path.suffix.lower()}"
+            if not source.exists():
+                try:
+                    data = image_headers.strip_metadata(path.read_bytes(), details.get("orientation", 1))
+                except (ValueError, struct.error, IndexError) as exc:
+                    print(f"WARNING: Not publishing {rel}, metadata could not be removed: {exc}")
+                    continue
+                write_atomic(source, data)
+            stripped.add(source.name)
+        link_file(source, target_dir / rel)
+        published.add(rel)
+        listed.add(path)
+
+    if store_dir.exists():
+        for entry in os.scandir(store_dir):
+            if entry.name not in stripped:
+                os.unlink(entry.path)
+    for rel in set(previous) - published:
+        path = Path(rel)
+        if path.is_absolute() or ".." in path.parts or path.suffix.lower() not in VALID_EXTENSIONS:
             continue
+        (target_dir / path).unlink(missing_ok=True)
+        for parent in path.parents[:-1]:
+            try:
+                (target_dir / parent).rmdir()
+            except OSError:
+                break
+    return listed
+
+
+def responsive_fields(entry):
+    # srcset per format in FORMATS order, for <picture><source type=...>.
+    variants = [
+        {
+            "src": f"{URL_PREFIX}/{VARIANTS_DIR}/{variant['name']}",
+            "type": variant["type"],
+            "width": variant["width"],
+            "height": variant["height"],
+            "bytes": variant["bytes"],
+        }
+        for variant in entry["variants"]
+    ]
+    types = list(dict.fromkeys(variant["type"] for variant in variants))
+    sources = [
+        {
+            "type": mime,
+            "srcset": ", ".join(
+                f"{variant['src']} {variant['width']}w" for variant in variants if variant["type"] == mime
+            ),
+        }
+        for mime in types
+    ]
+    fallback = [variant for variant in variants if variant["type"] == types[-1]]
+    return {
+        "width": entry["width"],
+        "height": entry["height"],
+        "color": entry["color"],
+        "lqip": entry["lqip"],
+        "thumb": fallback[0]["src"],
+        "sources": sources,
+        "variants": variants,
+    }
+
+
+def list_images(images_dir, recursive=False):
+    candidates = images_dir.rglob("*") if recursive else images_dir.iterdir()
+    return [
+        path
+        for path in sorted(candidates)
+        if path.is_file()
+        and path.suffix.lower() in VALID_EXTENSIONS
+        and not any(part.startswith(".") for part in path.relative_to(images_dir).parts)
+    ]
+
+
+def album_id(name):
+    ascii_name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii")
+    return re.sub(r"[^a-z0-9]+", "-", ascii_name.lower()).strip("-") or ROOT_ALBUM[0]
+
+
+def list_albums(images_dir):
+    # (id, title, paths) per album. Subdirectories, including their own
+    # subfolders, are albums, newest name first (2025-09-sommerfest before
+    # 2025-05-...); the top-level photos come last.
+    albums = []
+    seen = set()
+
+    def add(name, title, paths):
+        slug, number = name, 1
+        while slug in seen:
+            number += 1
+            slug = f"{name}-{number}"
+        seen.add(slug)
+        albums.append((slug, title, paths))
+
+    for path in sorted(images_dir.iterdir(), reverse=True):
+        if not path.is_dir() or path.name.startswith("."):
+            continue
+        paths = list_images(path, recursive=True)
+        if paths:
+            add(album_id(path.name), caption_from_filename(path.name), paths)
+    root = list_images(images_dir)
+    if root:
+        add(*ROOT_ALBUM, root)
+    return albums
+
+
+def capture_order(paths, metadata):
+    # Oldest first by EXIF capture time, else by the date a file name starts
+    # with (2025-09-13-...); images without either follow in name order.
+    def key(path):
+        details = metadata.get(path, {})
+        match = DATE_PREFIX_PATTERN.match(path.name)
+        taken = details.get("taken") or (match.group(1) if match else None)
+        return (taken is None, taken or "", path)
+
+    return sorted(paths, key=key)
+
+
+def collect_images(images_dir, variants=None, paths=None, metadata=None):
+    # variants maps paths to their cache entry (see update_variants); images
+    # without one are listed as originals only, with the header dimensions
+    # from metadata (path -> image_headers.read_metadata()) where known.
+    items = []
+    for path in list_images(images_dir) if paths is None else paths:
         caption = caption_from_filename(path.name)
-        items.append(
-            {
-                "src": f"gallery-pics/{path.name}",
-                "alt": caption,
-                "caption": caption,
-            }
-        )
+        item = {
+            "src": f"{URL_PREFIX}/{path.relative_to(images_dir).as_posix()}",
+            "alt": caption,
+            "caption": caption,
+        }
+        details = (metadata or {}).get(path, {})
+        if "width" in details:
+            item["width"], item["height"] = details["width"], details["height"]
+        entry = (variants or {}).get(path)
+        if entry:
+            item.update(responsive_fields(entry))
+        items.append(item)
     return items
 
 
+def indexed_pages(index_path):
+    return indexed_names(
+        index_path, lambda index: (page.rsplit("/", 1)[-1] for album in index["albums"] for page in album["pages"])
+    )
+
+
+def indexed_sources(index_path):
+    # Originals listed by the pages of index_path, relative to its directory;
+    # only these are ever removed again.
+    sources = set()
+    for name in indexed_pages(index_path):
+        try:
+            with open(index_path.parent / PAGES_DIR / name, "r", encoding="utf-8") as f:
+                sources.update(item["src"] for item in json.load(f))
+        except (OSError, ValueError, KeyError, TypeError):
+            continue
+    prefix = f"{URL_PREFIX}/"
+    return {src[len(prefix) :] for src in sources if isinstance(src, str) and src.startswith(prefix)}
+
+
+def write_manifest(images_dir, output_file, cache_dir=DEFAULT_CACHE_DIR, jobs=1, page_size=PAGE_SIZE):
+    # Pages first, then the index (see fileio.indexed_names). Returns the
+    # number of items.
+    if page_size < 1:
+        raise ValueError("page_size must be at least 1")
+    albums = list_albums(images_dir)
+    paths = [path for _, _, album_paths in albums for path in album_paths]
+    cache_dir = Path(cache_dir)
+    cache = load_cache(cache_dir)
+    sources = {path.as_posix(): file_record(path, cache["sources"].get(path.as_posix())) for path in paths}
+    metadata = {}
+    for path in paths:
+        digest = sources[path.as_posix()]["sha256"]
+        if digest not in metadata:
+            cached = cache["metadata"].get(digest)
+            metadata[digest] = image_headers.read_metadata(path) if cached is None else cached
+    images = cache["images"]
+    variants = None
+    if Image is None:
+        print("WARNING: Pillow not installed, gallery.json lists the original images only.")
+    else:
+        variants, images = update_variants(
+            paths, sources, metadata, cache["images"], output_file.parent / VARIANTS_DIR, cache_dir, jobs
+        )
+    published = publish_originals(
+        images_dir, paths, sources, metadata, output_file.parent, cache_dir, indexed_sources(output_file)
+    )
+    if sources != cache["sources"] or metadata != cache["metadata"] or images != cache["images"]:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        save_cache(cache_dir, sources, metadata, images)
+    details = {path: metadata[sources[path.as_posix()]["sha256"]] for path in paths}
+
+    pages_dir = output_file.parent / PAGES_DIR
+    pages_dir.mkdir(parents=True, exist_ok=True)
+    previous = indexed_pages(output_file)
+    index = []
+    count = 0
+    for album, title, paths in albums:
+        paths = [path for path in paths if path in published]
+        if not paths:
+            continue
+        items = collect_images(images_dir, variants, capture_order(paths, details), details)
+        count += len(items)
+        pages = []
+        for number, start in enumerate(range(0, len(items), page_size), 1):
+            data = json.dumps(items[start : start + page_size], ensure_ascii=False, separators=(",", ":"))
+            data = data.encode("utf-8")
+            name = f"{album}-{number}.{hashlib.sha256(data).hexdigest()[:HASH_LENGTH]}.json"
+            write_if_changed(pages_dir / name, data)
+            pages.append(f"{URL_PREFIX}/{PAGES_DIR}/{name}")
+        index.append({"id": album, "title": title, "count": len(items), "pages": pages})
+
+    data = json.dumps({"page_size": page_size, "albums": index}, ensure_ascii=False, indent=2) + "\n"
+    write_if_changed(output_file, data.encode("utf-8"))
+
+    current = {page.rsplit("/", 1)[-1] for album in index for page in album["pages"]} | previous
+    for path in pages_dir.iterdir():
+        base = path.name.removesuffix(".gz").removesuffix(".br")
+        if PAGE_PATTERN.match(base) and base not in current:
+            path.unlink()
+    return count
+
+
 def main():
     parser = argparse.ArgumentParser(description="Build gallery manifest JSON from image directory.")
     parser.add_argument("--images-dir", required=True, help="Directory containing gallery images")
     parser.add_argument("--output", required=True, help="Output JSON file path")
+    parser.add_argument(
+        "--cache-dir",
+        default=os.environ.get("GALLERY_CACHE_DIR", DEFAULT_CACHE_DIR),
+        help="Cache for generated variants, keyed by source hash and variant spec",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Worker processes for new or changed images (default: all cores)",
+    )
+    parser.add_argument("--page-size", type=int, default=PAGE_SIZE, help="Items per album page")
     args = parser.parse_args()
+    if args.page_size < 1:
+        parser.error("--page-size must be at least 1")
 
     images_dir = Path(args.images_dir)
     output_file = Path(args.output)
@@ -49,13 +557,8 @@ def main():
     if not images_dir.exists():
         raise SystemExit(f"Images directory not found: {images_dir}")
 
-    items = collect_images(images_dir)
-    output_file.parent.mkdir(parents=True, exist_ok=True)
-    with output_file.open("w", encoding="utf-8") as f:
-        json.dump(items, f, ensure_ascii=False, indent=2)
-        f.write("\n")
-
-    print(f"Wrote {len(items)} gallery items to {output_file}")
+    count = write_manifest(images_dir, output_file, args.cache_dir, args.jobs, args.page_size)
+    print(f"Wrote {count} gallery items to {output_file}")
 
 
 if __name__ == "__main__":
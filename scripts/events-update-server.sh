@@ -20,6 +20,12 @@ else
   PYTHON_BIN="$(command -v python3)"
 fi
 
-"$PYTHON_BIN" "$PROJECT_ROOT/events.py"
+"$PYTHON_BIN" "$PROJECT_ROOT/events.py" --output "$PROJECT_ROOT/events.json" \
+  --ics "$PROJECT_ROOT/schedule.ics" --force
 install -m 0644 "$PROJECT_ROOT/events.json" "$DEPLOY_DIR/events.json"
+install -m 0644 "$PROJECT_ROOT/schedule.ics" "$DEPLOY_DIR/schedule.ics"
+"$PYTHON_BIN" "$PROJECT_ROOT/precompress.py" "$DEPLOY_DIR/events.json" "$DEPLOY_DIR/schedule.ics"
+"$PYTHON_BIN" "$PROJECT_ROOT/events_shards.py" "$DEPLOY_DIR/events.json" "$DEPLOY_DIR/events"
+"$PYTHON_BIN" "$PROJECT_ROOT/build_pages.py" --events "$PROJECT_ROOT/events.json" \
+  --page schedule.html "$PROJECT_ROOT/static" "$DEPLOY_DIR"
 echo "INFO: Updated events."
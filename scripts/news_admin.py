@@ -7,12 +7,20 @@ import subprocess
 import sys
 from datetime import datetime
 from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
 
 
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 DEFAULT_NEWS_FILE = os.path.join(BASE_DIR, "static", "news.json")
 DEFAULT_TEMPLATES_FILE = os.path.join(BASE_DIR, "static", "news_templates.json")
 DEFAULT_DEPLOY_DIR = "/var/www/ohmoors.de/html"
+DEFAULT_STATIC_DIR = os.path.join(BASE_DIR, "static")
+# Pages that embed pre-rendered news and are refreshed on deploy.
+NEWS_PAGES = ("index.html", "news.html")
+
+sys.path.insert(0, BASE_DIR)
+import build_pages  # noqa: E402
+from precompress import precompress  # noqa: E402
 
 
 HTML_PAGE = r"""<!doctype html>
@@ -1607,7 +1615,7 @@ def git_commit_and_push(news_path, templates_path, message):
     return "news.json und news_templates.json wurden committed und gepusht."
 
 
-def deploy_news(news_path, deploy_dir):
+def deploy_news(news_path, deploy_dir, static_dir=DEFAULT_STATIC_DIR):
     news_path = os.path.realpath(news_path)
     deploy_dir = os.path.realpath(deploy_dir)
     os.makedirs(deploy_dir, exist_ok=True)
@@ -1615,7 +1623,14 @@ def deploy_news(news_path, deploy_dir):
     tmp_path = f"{target_path}.tmp"
     shutil.copyfile(news_path, tmp_path)
     os.replace(tmp_path, target_path)
-    return f"news.json wurde nach {deploy_dir} deployt."
+    precompress(target_path)
+    build_pages.render_pages(
+        Path(static_dir),
+        Path(deploy_dir),
+        NEWS_PAGES,
+        news_path=news_path,
+    )
+    return f"news.json, {' und '.join(NEWS_PAGES)} wurden nach {deploy_dir} deployt."
 
 
 class NewsHandler(BaseHTTPRequestHandler):
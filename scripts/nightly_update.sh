@@ -5,6 +5,9 @@ ROOT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")/.." && pwd)"
 DEPLOY_DIR="${DEPLOY_DIR:-/var/www/ohmoors.de/html}"
 PROJECT_ROOT="${PROJECT_ROOT:-$ROOT_DIR}"
 LOCK_FILE="${LOCK_FILE:-/tmp/ohmoors-events.lock}"
+DIFF_FILE="${DIFF_FILE:-$PROJECT_ROOT/.cache/events/last-diff.json}"
+EVENTS_STORE="${EVENTS_STORE:-$PROJECT_ROOT/.cache/events/events.sqlite}"
+PENDING_FILE="${PENDING_FILE:-$PROJECT_ROOT/.cache/events/deploy-pending}"
 
 if [[ -x "$PROJECT_ROOT/.venv/bin/python" ]]; then
   PYTHON_BIN="$PROJECT_ROOT/.venv/bin/python"
@@ -42,14 +45,42 @@ cleanup() {
 }
 trap cleanup EXIT
 
-echo "INFO: Generating events.json from calendar feed..."
-(cd "$tmp_dir" && "$PYTHON_BIN" "$PROJECT_ROOT/events.py")
+echo "INFO: Generating events.json and schedule.ics from calendar feed..."
+# events.py exits with 3 when the feed answered 304 Not Modified for a
+# window it already covered, or when the canonical output hashes equal to the
+# deployed events.json; deploy, backup and the schedule render are skipped then.
+# schedule.ics is written in the same pass; a missing one forces a full run.
+# events.py records the feed state as soon as it succeeds, so PENDING_FILE
+# stays behind until the deploy below has finished: a run that failed after
+# events.py is redone in full by the next one instead of ending in a 304.
+force_args=()
+if [[ ! -f "$DEPLOY_DIR/schedule.ics" || -f "$PENDING_FILE" ]]; then
+  force_args=(--force)
+fi
+mkdir -p "$(dirname "$PENDING_FILE")"
+touch "$PENDING_FILE"
+status=0
+"$PYTHON_BIN" "$PROJECT_ROOT/events.py" --output "$tmp_dir/events.json" --ics "$tmp_dir/schedule.ics" \
+  --compare "$DEPLOY_DIR/events.json" --diff "$DIFF_FILE" --store "$EVENTS_STORE" \
+  ${force_args[@]+"${force_args[@]}"} || status=$?
+if [[ "$status" -eq 3 ]]; then
+  echo "INFO: No event changes. Nothing to deploy."
+  rm -f "$PENDING_FILE"
+  exit 0
+elif [[ "$status" -ne 0 ]]; then
+  exit "$status"
+fi
 
 candidate="$tmp_dir/events.json"
 if [[ ! -s "$candidate" ]]; then
   echo "ERROR: Generated events.json is missing or empty."
   exit 2
 fi
+ics_candidate="$tmp_dir/schedule.ics"
+if ! head -n 1 "$ics_candidate" 2>/dev/null | grep -q '^BEGIN:VCALENDAR'; then
+  echo "ERROR: Generated schedule.ics is missing or invalid."
+  exit 2
+fi
 
 "$PYTHON_BIN" -m json.tool "$candidate" >/dev/null
 
@@ -57,10 +88,24 @@ dest="$DEPLOY_DIR/events.json"
 backup="$DEPLOY_DIR/events.json.last-good"
 staged="$DEPLOY_DIR/.events.json.tmp.$$"
 
+ics_dest="$DEPLOY_DIR/schedule.ics"
+ics_staged="$DEPLOY_DIR/.schedule.ics.tmp.$$"
+
 install -m 0644 "$candidate" "$staged"
+install -m 0644 "$ics_candidate" "$ics_staged"
 if [[ -f "$dest" ]]; then
   install -m 0644 "$dest" "$backup"
 fi
 mv -f "$staged" "$dest"
+mv -f "$ics_staged" "$ics_dest"
+"$PYTHON_BIN" "$PROJECT_ROOT/precompress.py" "$dest" "$ics_dest"
+"$PYTHON_BIN" "$PROJECT_ROOT/events_shards.py" "$dest" "$DEPLOY_DIR/events"
+
+# Rendered straight into DEPLOY_DIR so the page picks up the deployed
+# asset-manifest.json; build_pages.py swaps it in atomically with its .gz/.br.
+echo "INFO: Pre-rendering schedule.html..."
+"$PYTHON_BIN" "$PROJECT_ROOT/build_pages.py" --events "$candidate" --page schedule.html \
+  "$PROJECT_ROOT/static" "$DEPLOY_DIR"
 
-echo "INFO: events.json updated successfully."
+rm -f "$PENDING_FILE"
+echo "INFO: events.json and schedule.ics updated successfully."
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+import argparse
+import hashlib
+import os
+import sys
+from pathlib import Path
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+DEFAULT_STATIC_DIR = os.path.join(BASE_DIR, "static")
+DEFAULT_DEPLOY_DIR = "/var/www/ohmoors.de/html"
+# The visibility state stays in the checkout: in the webroot it would be
+# served publicly and removed by every rsync --delete deploy.
+DEFAULT_STATE_FILE = os.path.join(BASE_DIR, ".cache", "news", "state.json")
+LEGACY_STATE_FILE = ".news-state.json"
+
+sys.path.insert(0, BASE_DIR)
+import build_pages  # noqa: E402
+import render_news  # noqa: E402
+from fileio import load_json_object, write_json  # noqa: E402
+
+
+def refresh(static_dir, deploy_dir, news_path, today, force=False, state_path=DEFAULT_STATE_FILE):
+    items = render_news.load_news(news_path)
+    news_sha = hashlib.sha256(news_path.read_bytes()).hexdigest() if news_path.exists() else ""
+    previous = {} if force else load_json_object(state_path)
+    # The state describes the pages of one deploy dir.
+    if previous.get("deploy_dir") != str(deploy_dir):
+        previous = {}
+
+    current = render_news.visibility(items, today)
+    changed = sorted(
+        name
+        for name, indices in current.items()
+        if previous.get("news_sha256") != news_sha or previous.get(name) != indices
+    )
+    pages = build_pages.pages_with_fragments(static_dir, set(changed)) if changed else []
+    if pages:
+        build_pages.render_pages(static_dir, deploy_dir, pages, news_path=news_path)
+    write_json(state_path, {"deploy_dir": str(deploy_dir), "news_sha256": news_sha, "today": today, **current})
+    (deploy_dir / LEGACY_STATE_FILE).unlink(missing_ok=True)
+    return pages, render_news.next_boundary(items, today)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(
+        description="Re-render news pages whose publication windows changed visibility."
+    )
+    parser.add_argument("--static-dir", default=DEFAULT_STATIC_DIR, help="Page templates")
+    parser.add_argument("--deploy-dir", default=DEFAULT_DEPLOY_DIR, help="Deployed site")
+    parser.add_argument(
+        "--news",
+        help="news.json to evaluate (default: news.json in the deploy dir)",
+    )
+    parser.add_argument(
+        "--state",
+        default=os.environ.get("NEWS_STATE_FILE", DEFAULT_STATE_FILE),
+        help="Where the visibility state of the last run is kept (outside the webroot)",
+    )
+    parser.add_argument("--today", help="Evaluate as of YYYY-MM-DD instead of today (Berlin)")
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Ignore the stored visibility state and re-render all news pages",
+    )
+    parser.add_argument(
+        "--print-next",
+        action="store_true",
+        help="Only print the next visibility change as a systemd OnCalendar value",
+    )
+    args = parser.parse_args(argv)
+
+    deploy_dir = Path(args.deploy_dir)
+    news_path = Path(args.news) if args.news else deploy_dir / "news.json"
+    today = args.today or render_news.berlin_today_key()
+
+    if args.print_next:
+        upcoming = render_news.next_boundary(render_news.load_news(news_path), today)
+        if upcoming:
+            print(f"{upcoming} 00:00:00 Europe/Berlin")
+        return
+
+    try:
+        pages, upcoming = refresh(
+            Path(args.static_dir), deploy_dir, news_path, today, args.force, Path(args.state)
+        )
+    except build_pages.BuildError as exc:
+        raise SystemExit(str(exc)) from None
+    if not pages:
+        print("INFO: No news visibility changes.")
+    if upcoming:
+        due = render_news.boundary_datetime(upcoming).isoformat()
+        print(f"INFO: Next news re-render due at {due}")
+    else:
+        print("INFO: No upcoming publication window changes.")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -10,7 +10,15 @@ after="$(git rev-parse HEAD)"
 
 if [[ "$before" != "$after" ]]; then
   source .venv/bin/activate
-  make clean build deploy
+  # The incremental build only replaces what it tracks in its manifest. Without
+  # a manifest of the current version (first run after the switch from the
+  # cp -a build, or a changed format) start from an empty _site once, so
+  # leftovers are not rsynced to production; deploy's --delete drops them there.
+  if ! python3 -c 'import sys; from pathlib import Path; import build_pages as b; sys.exit(not b.load_manifest(Path("_site") / b.MANIFEST_NAME))'; then
+    echo "INFO: Kein aktuelles Build-Manifest, baue _site einmal komplett neu."
+    make clean
+  fi
+  make build deploy
 else
   echo "INFO: Kein Git-Update vorhanden, überspringe make."
 fi